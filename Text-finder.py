@@ -1,14 +1,29 @@
 import sys
 import os
 import re
-import urllib.parse
-import PyPDF2
-from concurrent.futures import ProcessPoolExecutor
-import subprocess
+import argparse
+import itertools
+import bisect
+import threading
+import contextlib
+import codecs
+import queue
+import functools
+from collections import deque, namedtuple
+import mmap
+import time
+import zlib
+# Everything a short text search does not need is imported where it is used, so it is not paid
+# for at startup: concurrent.futures and multiprocessing (worker pools), subprocess and PyPDF2
+# (PDFs), sqlite3 and hashlib (PDF cache and index), asyncio (--io-concurrency), ahocorasick,
+# json and urllib.parse (output) and the banner's pyfiglet/termcolor
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    # Python < 3.11
+    import sre_parse
 
-from colorama import init
-from termcolor import cprint 
-from pyfiglet import figlet_format
 
 # --- ANSI Color Codes ---
 COLOR_MAP = {
@@ -33,220 +48,2361 @@ COLOR_MAP = {
 RESET_COLOR = '\033[0m' # Resets terminal color to default
 # ------------------------
 
-print()
-cprint(figlet_format('Asteroth text finder', font='slant', width=110),
-       'red', attrs=['bold'])
+# Text files are scanned in line-aligned buffers of about this many characters
+SCAN_CHUNK_SIZE = 8 * 1024 * 1024
+# Files at least this big are memory-mapped and searched as bytes when the sentence is ASCII
+MMAP_MIN_SIZE = 16 * 1024 * 1024
+# With a process pool, small text files are grouped into worker tasks of up to this many bytes or
+# files, so pickling and IPC costs are paid per batch; a file at least TEXT_BATCH_MAX_BYTES big is
+# a task of its own. Batches only grow while every worker is busy, and threads get a file per task
+TEXT_BATCH_MAX_BYTES = 8 * 1024 * 1024
+TEXT_BATCH_MAX_FILES = 256
+# Files at least this big are cut into FILE_RANGE_SIZE byte ranges on line boundaries and the
+# ranges are scanned by several worker processes
+LARGE_FILE_SPLIT_SIZE = 256 * 1024 * 1024
+FILE_RANGE_SIZE = 64 * 1024 * 1024
+# A worker task hands back at most this many hits. It stops at the next one and a follow-up task
+# resumes from there, so a file or range with millions of hits is never held in memory at once
+TASK_MAX_HITS = 10000
+
+# --- Configure the file extensions to search ---
+DEFAULT_EXTENSIONS = ['.html', '.htm', '.txt', '.css', '.js', '.py', '.md', '.xml', '.json', '.log', '.csv', '.sh', '.yml', '.yaml', '.conf', '.pdf']
+# ---------------------------------------------
+
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'text-finder')
+
+# pdftotext output (and cached PDF text) is consumed in pieces of up to this many bytes
+PDF_READ_CHUNK_SIZE = 64 * 1024
+
+# PDFs handed to a process worker per task; amortizes pickling and scheduling without
+# letting one batch hold back too much work behind a slow document
+PDF_BATCH_SIZE = 8
+
+# --- PDF text cache ---
+# Extracted PDF text is kept in SQLite, keyed on path, size and mtime, and evicted least recently used first
+PDF_CACHE_PATH = os.path.join(CACHE_DIR, 'pdf_text.sqlite3')
+PDF_CACHE_MAX_BYTES = 1024 * 1024 * 1024 # Compressed size cap
+PDF_CACHE_SCHEMA_VERSION = 3 # Bumped when the stored page layout changes; older caches are dropped
+# ----------------------
+
+# Persistent inverted indexes (one SQLite file per indexed folder) live here
+INDEX_DIR = os.path.join(CACHE_DIR, 'indexes')
+# Bumped whenever the index tables change; older indexes are rebuilt from scratch
+INDEX_SCHEMA_VERSION = 5
+# Substring queries look up at most this many of the needle's trigrams
+MAX_QUERY_TRIGRAMS = 64
+
+# The progress line is redrawn at most this many times a second, and only on a terminal
+PROGRESS_UPDATES_PER_SECOND = 4
 
-def search_text_files(folder_path, search_sentence, file_extensions_to_search):
+# One search hit. A namedtuple has no per-instance __dict__, and file_path is interned once per
+# file so every hit of a file shares the same string.
+# page_number is None for text files, patterns is None unless several sentences were searched
+# at once, then it holds the ones found on the line.
+Match = namedtuple('Match', ['file_path', 'line_number', 'line_content', 'page_number', 'patterns'], defaults=(None, None))
+
+# A literal sentence searched without the regex engine: needle is the casefolded sentence (str,
+# or bytes for ASCII sentences run over bytes buffers)
+_LiteralPattern = namedtuple('_LiteralPattern', ['needle'])
+# UTF-8 of the non-ASCII characters whose casefold() holds ASCII letters (ß -> ss, ﬁ -> fi, the
+# Kelvin sign -> k, ...): an ASCII needle can only match non-ASCII text through one of them
+_ASCII_FOLDING_BYTES = re.compile(b'|'.join(re.escape(char.encode('utf-8')) for char in
+                                            '\xdf\u0130\u0149\u017f\u01f0\u1e96\u1e97\u1e98\u1e99\u1e9a\u1e9e\u212a\ufb00\ufb01\ufb02\ufb03\ufb04\ufb05\ufb06'))
+# Several sentences searched in one pass: parts holds each sentence's own _LiteralPattern (used
+# to tag matching lines) and automaton an Aho-Corasick automaton over the casefolded sentences,
+# or None
+_MultiPattern = namedtuple('_MultiPattern', ['sentences', 'parts', 'automaton'])
+# A regular expression search, matched line by line: prefilter is a _LiteralPattern for the longest
+# literal every match must contain (None if there is none), scan_regex the regex in MULTILINE
+# mode for finding candidate lines without a prefilter, regex the user's pattern each candidate
+# line is checked against
+_RegexPattern = namedtuple('_RegexPattern', ['regex', 'scan_regex', 'prefilter'])
+# re.IGNORECASE matches these to one another (i to ı, I to İ, ...) but casefold() keeps them apart,
+# so a regex literal holding one can't be looked for in casefolded text. Every other character
+# re.IGNORECASE matches to another casefolds the same way (checked over all of Unicode against
+# the case groups re uses)
+_IGNORECASE_ONLY_FOLDS = re.compile('[Ii\u0130\u0131]')
+# Where a worker task that reached TASK_MAX_HITS stopped in a file: offset (in bytes, or characters
+# for text read ahead of time) and line_number of the line with the next hit, and the number of
+# hits already taken from the file
+_ResumePoint = namedtuple('_ResumePoint', ['offset', 'line_number', 'hits'])
+
+def _print_banner():
     """
-    Searches through specified text files in a given folder for a specific sentence.
-    Includes a progress bar in the terminal.
+    Prints the figlet banner; only done for interactive runs, so scripts get clean output.
+    """
+    # Imported here so searches and library use don't pay for them at startup
+    from termcolor import cprint
+    from pyfiglet import figlet_format
+
+    print()
+    cprint(figlet_format('Asteroth text finder', font='slant', width=110),
+           'red', attrs=['bold'])
+
+def _walk_file_entries(folder_path, file_extensions):
+    """
+    Walks a folder tree once with os.scandir and yields matching files as they are found.
+
+    Uses an explicit directory stack instead of os.walk, so no per-directory lists of
+    names are built and files can be handed to the search stage straight away.
 
     Args:
-        folder_path (str): The absolute path to the folder containing files.
-        search_sentence (str): The exact sentence to search for.
-        file_extensions_to_search (list): A list of file extensions (e.g., ['.txt', '.css', '.js'])
-                                           to include in the search. Extensions should include the dot.
+        folder_path (str): The folder to walk.
+        file_extensions (list): Lower-case extensions (with the dot) to yield.
 
-    Returns:
-        list: A list of dictionaries, each containing 'file_path', 'line_number', and 'line_content'.
+    Yields:
+        os.DirEntry: The entry of each file whose extension is in file_extensions.
     """
-    found_occurrences = []
-    escaped_sentence = re.escape(search_sentence)
-    pattern = re.compile(escaped_sentence, re.IGNORECASE)
+    pending_dirs = [folder_path]
+    while pending_dirs:
+        current_dir = pending_dirs.pop()
+        try:
+            with os.scandir(current_dir) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending_dirs.append(entry.path)
+                        elif entry.is_file():
+                            _, file_extension = os.path.splitext(entry.name)
+                            if file_extension.lower() in file_extensions:
+                                yield entry
+                    except OSError:
+                        continue
+        except OSError as e:
+            sys.stdout.write(f"\nError listing {current_dir}: {e}\n")
+            sys.stdout.flush()
 
-    if not os.path.isdir(folder_path):
-        print(f"Error: Folder not found at '{folder_path}'")
-        return []
+def _walk_files(folder_path, file_extensions):
+    """
+    Same as _walk_file_entries, but yields the path of each matching file.
+    """
+    for entry in _walk_file_entries(folder_path, file_extensions):
+        yield entry.path
+
+def _scan_directory(directory, file_extensions):
+    """
+    Lists one directory for _prefetch_files, filtering like _walk_file_entries.
+    Returns (subdirectories, file_paths).
+    """
+    subdirectories = []
+    file_paths = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    elif entry.is_file():
+                        _, file_extension = os.path.splitext(entry.name)
+                        if file_extension.lower() in file_extensions:
+                            file_paths.append(entry.path)
+                except OSError:
+                    continue
+    except OSError as e:
+        sys.stdout.write(f"\nError listing {directory}: {e}\n")
+        sys.stdout.flush()
+    return subdirectories, file_paths
+
+def _prefetch_file(file_path):
+    """
+    Reads a text file for _prefetch_files, stat'ing it through the open file.
+    Returns its text, or None for PDFs, files of SCAN_CHUNK_SIZE or more (left to the streaming
+    scanners) and files that can't be read (the scanners then report the error).
+    """
+    if file_path.lower().endswith('.pdf'):
+        return None
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore', newline='') as f:
+            if os.fstat(f.fileno()).st_size >= SCAN_CHUNK_SIZE:
+                return None
+            return f.read()
+    except OSError:
+        return None
 
-    print(f"Searching for '{search_sentence}' in files with extensions {file_extensions_to_search} under '{folder_path}'...")
+async def _prefetch_files(folder_path, file_extensions, io_concurrency, ready, stop):
+    """
+    Lists folder_path's tree and reads its files with up to io_concurrency blocking calls
+    (scandir, open, read) in flight on a thread pool, so listing, stat and reads overlap
+    instead of waiting on each other's round trips.
 
-    # --- First pass: Count total relevant files for the progress bar ---
-    total_files_to_process = 0
-    print("Counting files... This might take a moment for large directories.")
-    for root, _, files in os.walk(folder_path):
-        for file_name in files:
-            _, file_extension = os.path.splitext(file_name)
-            if file_extension.lower() in file_extensions_to_search:
-                total_files_to_process += 1
-    print(f"Found {total_files_to_process} files to search.")
+    Directory listers and file readers are two sets of io_concurrency tasks joined by a bounded
+    queue. Each file is put on ready (a queue.Queue read by the search thread) as
+    (file_path, text or None), then None once everything has been handed over. Stops early
+    once stop is set.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
 
-    if total_files_to_process == 0:
-        print("No files matching the specified extensions found. Exiting.")
-        return []
+    loop = asyncio.get_running_loop()
+    directories = asyncio.Queue()
+    directories.put_nowait(folder_path)
+    files = asyncio.Queue(maxsize=io_concurrency * 4)
 
-    # --- Second pass: Perform the actual search with a progress bar ---
-    processed_files_count = 0
-    for root, _, files in os.walk(folder_path):
-        for file_name in files:
-            _, file_extension = os.path.splitext(file_name)
-            if file_extension.lower() in file_extensions_to_search:
-                processed_files_count += 1
-                file_path = os.path.join(root, file_name)
-
-                # Update progress bar
-                progress_percent = (processed_files_count / total_files_to_process) * 100
-                sys.stdout.write(f"\r[{processed_files_count}/{total_files_to_process}] {progress_percent:.1f}% - Processing: {file_name[:50]}...")
-                sys.stdout.flush()
+    async def hand_over(item):
+        # ready belongs to another thread, so back off while it is full instead of blocking the loop
+        delay = 0.001
+        while not stop.is_set():
+            try:
+                ready.put_nowait(item)
+                return
+            except queue.Full:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.05)
+
+    async def list_directories():
+        while True:
+            directory = await directories.get()
+            try:
+                if stop.is_set():
+                    continue
+                subdirectories, file_paths = await loop.run_in_executor(executor, _scan_directory, directory, file_extensions)
+                for subdirectory in subdirectories:
+                    directories.put_nowait(subdirectory)
+                for file_path in file_paths:
+                    await files.put(file_path)
+            finally:
+                directories.task_done()
 
+    async def read_files():
+        while True:
+            file_path = await files.get()
+            try:
+                if not stop.is_set():
+                    await hand_over((file_path, await loop.run_in_executor(executor, _prefetch_file, file_path)))
+            finally:
+                files.task_done()
+
+    with ThreadPoolExecutor(max_workers=io_concurrency) as executor:
+        tasks = [asyncio.create_task(list_directories()) for _ in range(io_concurrency)]
+        tasks += [asyncio.create_task(read_files()) for _ in range(io_concurrency)]
+        await directories.join()
+        await files.join()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    await hand_over(None)
+
+def _iter_prefetched_files(folder_path, file_extensions, io_concurrency):
+    """
+    Runs _prefetch_files on an event loop in a background thread and yields its
+    (file_path, text or None) pairs. At most io_concurrency read files wait to be scanned.
+    Closing the generator stops the pipeline; if the pipeline fails, its exception is raised here.
+    """
+    # Only io_concurrency searches need asyncio, and it is slow to import
+    import asyncio
+
+    if io_concurrency < 1:
+        raise ValueError(f"io_concurrency must be at least 1, got {io_concurrency}")
+    ready = queue.Queue(maxsize=io_concurrency)
+    stop = threading.Event()
+    closed = threading.Event()
+    failure = []
+
+    def run_pipeline():
+        try:
+            asyncio.run(_prefetch_files(folder_path, file_extensions, io_concurrency, ready, stop))
+        except BaseException as e:
+            failure.append(e)
+            stop.set()
+            # The end marker was never handed over: send it, so the reader re-raises instead of
+            # waiting forever (unless the reader is already gone)
+            while not closed.is_set():
                 try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        for line_num, line in enumerate(f, 1):
-                            if pattern.search(line):
-                                found_occurrences.append({'file_path': file_path, 'line_number': line_num, 'line_content': line.strip()})
-                except Exception as e:
-                    # Print error on a new line to not interfere with progress bar
-                    sys.stdout.write(f"\nError reading {file_path}: {e}\n")
-                    sys.stdout.flush()
-    sys.stdout.write("\n") # Move to a new line after progress bar is complete
-    sys.stdout.flush()
+                    ready.put(None, timeout=0.05)
+                    break
+                except queue.Full:
+                    continue
 
-    return found_occurrences
+    thread = threading.Thread(target=run_pipeline, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = ready.get()
+            if item is None:
+                if failure:
+                    raise failure[0]
+                return
+            yield item
+    finally:
+        stop.set()
+        closed.set()
+        thread.join()
 
-def _search_single_pdf(filepath, search_term):
+# Held while writing to the terminal, so progress redraws don't cut into printed results
+_output_lock = threading.Lock()
+
+def _start_progress(render):
     """
-    Helper function to search a single PDF file for a term using pdftotext.
-    Returns a list of occurrences found in this file.
+    Redraws the progress line with render() at most PROGRESS_UPDATES_PER_SECOND times a second
+    from a daemon thread, so the search loop only bumps counters and never writes to the
+    terminal itself. Nothing is drawn when stdout is not a terminal.
+
+    Returns finish(final_line=None), which stops the ticker (it may be called more than once)
+    and, on a terminal, replaces the progress line with final_line.
     """
-    file_occurrences = []
-    escaped_term = re.escape(search_term)
-    pattern = re.compile(escaped_term, re.IGNORECASE)
+    if not sys.stdout.isatty():
+        return lambda final_line=None: None
+    stop = threading.Event()
+
+    def tick():
+        while not stop.wait(1 / PROGRESS_UPDATES_PER_SECOND):
+            with _output_lock:
+                sys.stdout.write(f"\r{render()}\x1b[K")
+                sys.stdout.flush()
+
+    ticker = threading.Thread(target=tick, daemon=True)
+    ticker.start()
 
+    def finish(final_line=None):
+        stop.set()
+        ticker.join()
+        if final_line:
+            with _output_lock:
+                sys.stdout.write(f"\r{final_line}\x1b[K\n")
+                sys.stdout.flush()
+    return finish
+
+def _format_throughput(files_count, bytes_count, started):
+    """
+    Returns files/s and MB/s since started (a time.monotonic() value) for progress lines.
+    """
+    elapsed = max(time.monotonic() - started, 1e-9)
+    return f"{files_count / elapsed:.0f} files/s, {bytes_count / elapsed / 1e6:.1f} MB/s"
+
+def _file_size(file_path):
+    """
+    Returns the size of a file, or 0 if it can't be stat'ed (whoever opens it reports the error).
+    """
     try:
-        # Call pdftotext to extract text
-        process = subprocess.run(['pdftotext', '-enc', 'UTF-8', filepath, '-'], capture_output=True, text=True, check=True)
-        text = process.stdout
-
-        if text:
-            lines = text.splitlines()
-            for line_idx, line in enumerate(lines, 1):
-                if pattern.search(line):
-                    file_occurrences.append({'file_path': filepath, 'page_number': 0, 'line_number': line_idx, 'line_content': line.strip()})
-                    # pdftotext doesn't easily give page numbers per line, so we'll use 0 or a placeholder
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
+
+def _count_newlines(buffer, start, end):
+    """
+    Counts newlines in buffer[start:end]. str and bytes count in place; an mmap has no
+    count() method, so it is counted in SCAN_CHUNK_SIZE slices to keep memory bounded.
+    """
+    if isinstance(buffer, (str, bytes)):
+        return buffer.count('\n' if isinstance(buffer, str) else b'\n', start, end)
+    newline_count = 0
+    for chunk_start in range(start, end, SCAN_CHUNK_SIZE):
+        newline_count += buffer[chunk_start:min(chunk_start + SCAN_CHUNK_SIZE, end)].count(b'\n')
+    return newline_count
+
+def _sentences(search_sentence):
+    """
+    Returns the sentences of a search as a tuple; a search is one sentence, a list of them
+    or a compiled regular expression (whose pattern string is returned).
+    """
+    if isinstance(search_sentence, str):
+        return (search_sentence,)
+    if isinstance(search_sentence, re.Pattern):
+        return (search_sentence.pattern,)
+    return tuple(search_sentence)
+
+def _is_ascii_search(search_sentence):
+    """
+    Returns True if every sentence of the search is ASCII, so it can be run over raw bytes.
+    A regular expression can when its prefilter literal is ASCII: the prefilter runs over the
+    bytes and only candidate lines are decoded for the regex.
+    """
+    if isinstance(search_sentence, re.Pattern):
+        literals = _foldable_literals(search_sentence)
+        return bool(literals) and max(literals, key=len).isascii()
+    return all(sentence.isascii() for sentence in _sentences(search_sentence))
+
+def _format_search(search_sentence):
+    """
+    Returns the sentence(s) of a search quoted for messages.
+    """
+    if isinstance(search_sentence, re.Pattern):
+        return f"/{search_sentence.pattern}/"
+    return ', '.join(f"'{sentence}'" for sentence in _sentences(search_sentence))
+
+@functools.lru_cache(maxsize=64)
+def _required_literals(regex):
+    """
+    Returns the literal substrings every match of regex has to contain, e.g. ('ERROR ',) for
+    r'ERROR \\d{3}'. Only runs of plain characters on the pattern's mandatory path count;
+    anything under an alternation, an optional repeat or a lookaround is left out.
+    """
+    try:
+        parsed = sre_parse.parse(regex.pattern, regex.flags)
+    except Exception:
+        return ()
+    repeats = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, 'POSSESSIVE_REPEAT', None)}
+    literals = []
+
+    def walk(items):
+        run = []
+        for op, argument in items:
+            if op is sre_parse.LITERAL:
+                run.append(chr(argument))
+                continue
+            if run:
+                literals.append(''.join(run))
+                run = []
+            if op is sre_parse.SUBPATTERN:
+                walk(argument[-1])
+            elif op in repeats and argument[0] >= 1:
+                walk(argument[2])
+            elif op is getattr(sre_parse, 'ATOMIC_GROUP', None):
+                walk(argument)
+        if run:
+            literals.append(''.join(run))
+
+    walk(parsed)
+    return tuple(literals)
+
+@functools.lru_cache(maxsize=64)
+def _foldable_literals(regex):
+    """
+    Returns the pieces of regex's required literals that every match holds once casefolded, so
+    they can be looked for in casefolded text (prefilter, trigrams). Under re.IGNORECASE a
+    literal is cut at the characters of _IGNORECASE_ONLY_FOLDS.
+    """
+    literals = _required_literals(regex)
+    if regex.flags & re.IGNORECASE and not regex.flags & re.ASCII:
+        literals = tuple(piece for literal in literals for piece in _IGNORECASE_ONLY_FOLDS.split(literal) if piece)
+    return literals
+
+def _compile_search(search_sentence, as_bytes=False):
+    """
+    Compiles a sentence, or a list of sentences, for _iter_matching_lines, matching
+    case-insensitively with full Unicode case folding (STRASSE finds straße). A sentence gets a
+    _LiteralPattern, searched with str/bytes.find over folded text instead of the regex engine.
+    A list gets a _MultiPattern, matched in a single pass, and a compiled regular expression a
+    _RegexPattern.
+    as_bytes compiles for bytes buffers and needs an ASCII search (see _is_ascii_search).
+    """
+    if isinstance(search_sentence, str):
+        return _compile_sentence(search_sentence, as_bytes)
+    if isinstance(search_sentence, re.Pattern):
+        return _compile_regex(search_sentence, as_bytes)
+    return _compile_sentences(tuple(search_sentence), as_bytes)
+
+@functools.lru_cache(maxsize=64)
+def _compile_sentence(search_sentence, as_bytes=False):
+    """
+    Compiles one sentence for _compile_search. Cached, since workers compile once per file.
+    """
+    if as_bytes:
+        return _LiteralPattern(search_sentence.encode('ascii').lower())
+    return _LiteralPattern(search_sentence.casefold())
+
+def _str_needle(needle):
+    """
+    Returns a _LiteralPattern needle as str; bytes needles are ASCII.
+    """
+    return needle if isinstance(needle, str) else needle.decode('ascii')
+
+@functools.lru_cache(maxsize=64)
+def _compile_sentences(sentences, as_bytes=False):
+    """
+    Compiles several sentences into one _MultiPattern for _compile_search.
+    The Aho-Corasick automaton needs pyahocorasick. Without it, sentences are found with one
+    find() per sentence over each folded window; either way each file is read once.
+    """
+    try:
+        # Optional, and only imported by multi-sentence searches
+        import ahocorasick
+    except ImportError:
+        ahocorasick = None
+    parts = tuple(_compile_sentence(sentence, as_bytes) for sentence in sentences)
+    automaton = None
+    if ahocorasick is not None and sentences and all(sentences):
+        automaton = ahocorasick.Automaton()
+        for sentence in sentences:
+            # Sentences that fold to the same needle keep a single entry; tagging is per line anyway
+            automaton.add_word(sentence.casefold(), len(sentence.casefold()))
+        automaton.make_automaton()
+    return _MultiPattern(sentences, parts, automaton)
+
+@functools.lru_cache(maxsize=64)
+def _compile_regex(regex, as_bytes=False):
+    """
+    Compiles a regular expression search for _compile_search. Its longest required literal
+    (see _foldable_literals) becomes a prefilter run with the literal search path, so only
+    lines holding it are checked against the regex. For bytes buffers only the prefilter is
+    bytes; candidate lines are decoded before the regex runs.
+    """
+    literals = _foldable_literals(regex)
+    prefilter = _compile_sentence(max(literals, key=len), as_bytes) if literals else None
+    return _RegexPattern(regex, re.compile(regex.pattern, regex.flags | re.MULTILINE), prefilter)
+
+def _matched_sentences(pattern, line):
+    """
+    Returns the sentences of a _MultiPattern found in a matching line, or None for a
+    single-sentence pattern.
+    """
+    if not isinstance(pattern, _MultiPattern):
+        return None
+    if not isinstance(line, str):
+        line = line.decode('utf-8', 'surrogateescape')
+    folded_line = line.lower() if line.isascii() else line.casefold()
+    return tuple(sentence for sentence, part in zip(pattern.sentences, pattern.parts)
+                 if _str_needle(part.needle) in folded_line)
+
+def _bind_finder(pattern, text, cancelled=None):
+    """
+    Returns find(position), giving the offset of the next hit of pattern in text at or after
+    position, or -1. If cancelled is given, it is called before each new window and find
+    gives up (returns -1) once it returns True.
+
+    A _LiteralPattern folds text one SCAN_CHUNK_SIZE window at a time (plus a few needle
+    lengths, so hits across a window edge are still found) and runs find() on the window.
+    A _MultiPattern runs its automaton over the same folded windows, or without pyahocorasick
+    keeps the next find() hit of every sentence and takes the first. ASCII windows are folded
+    with lower(), others with casefold() (bytes are decoded first, unless they hold nothing
+    that folds into ASCII). When casefold() changes the window's length, hits are mapped back
+    through the line they are on, which is all _iter_matching_lines needs.
+    """
+    if isinstance(pattern, _RegexPattern):
+        # Finds candidate lines; _iter_matching_lines checks them against the regex
+        return _bind_finder(pattern.prefilter or pattern.scan_regex, text, cancelled)
+    if isinstance(pattern, _MultiPattern) and len(pattern.parts) == 1:
+        return _bind_finder(pattern.parts[0], text, cancelled)
+
+    # bind_window(folded_window) returns search(position) for hits in that window, positions only growing.
+    # Folded windows are str when they had to be decoded, so needles come in both types.
+    if isinstance(pattern, _LiteralPattern):
+        needle = pattern.needle
+        needles_by_type = {type(needle): needle, str: _str_needle(needle)}
+        overlap = len(needle) * 4
+
+        def bind_window(window):
+            window_needle = needles_by_type[type(window)]
+            return lambda position: window.find(window_needle, position)
+    elif isinstance(pattern, _MultiPattern) and pattern.automaton is None:
+        needles = [part.needle for part in pattern.parts]
+        needles_by_type = {type(needles[0]): needles, str: [_str_needle(needle) for needle in needles]}
+        overlap = max(map(len, needles)) * 4
+
+        def bind_window(window):
+            window_needles = needles_by_type[type(window)]
+            # Next hit of each needle (-1: none left), refreshed with find() once passed
+            next_hits = [-2] * len(window_needles)
+
+            def search(position):
+                first_hit = -1
+                for needle_index, needle in enumerate(window_needles):
+                    hit = next_hits[needle_index]
+                    if hit != -1 and hit < position:
+                        hit = next_hits[needle_index] = window.find(needle, position)
+                    if hit != -1 and (first_hit == -1 or hit < first_hit):
+                        first_hit = hit
+                return first_hit
+            return search
+    elif isinstance(pattern, _MultiPattern):
+        automaton = pattern.automaton
+        overlap = max(map(len, pattern.sentences)) * 4
+
+        def bind_window(window):
+            if not isinstance(window, str):
+                # The automaton takes str; latin-1 maps every byte to one character, keeping offsets
+                window = window.decode('latin-1')
+            # One pass per window: every automaton.iter() call costs the whole window
+            hits = automaton.iter(window)
+
+            def search(position):
+                # Hits come by end offset; the first one past position is in the first matching
+                # line, which is all that counts
+                for end_index, sentence_length in hits:
+                    if end_index - sentence_length + 1 >= position:
+                        return end_index - sentence_length + 1
+                return -1
+            return search
+    else:
+        def find(position):
+            match = pattern.search(text, position)
+            return -1 if match is None else match.start()
+        return find
+
+    def bind_folded_window(window):
+        """
+        Folds a window and binds it. Returns (search, to_folded, to_original): the offset
+        converters are None when folding kept every offset, otherwise they map the line
+        starts (and the window start) between the window and its folded form.
+        """
+        if window.isascii():
+            return bind_window(window.lower()), None, None
+        if isinstance(window, str):
+            folded = window.casefold()
+            if len(folded) == len(window):
+                return bind_window(folded), None, None
+        elif _ASCII_FOLDING_BYTES.search(window) is None:
+            # Needles of bytes patterns are ASCII, and only these characters fold into ASCII
+            # letters, so lower() finds the same hits as casefold() here
+            return bind_window(window.lower()), None, None
+        else:
+            folded = window.decode('utf-8', 'surrogateescape').casefold()
+        # casefold() changed lengths (ß -> ss, or bytes decoded to str), but never newlines, so
+        # the n-th line of the folded window is the n-th line of the window. The line starts are
+        # only listed once a hit needs them
+        newline = '\n' if isinstance(window, str) else b'\n'
+        listed_line_starts = None
+
+        def line_starts():
+            nonlocal listed_line_starts
+            if listed_line_starts is None:
+                listed_line_starts = ([0] + [match.end() for match in re.finditer(re.escape(newline), window)],
+                                      [0] + [match.end() for match in re.finditer('\n', folded)])
+            return listed_line_starts
+
+        def to_folded(position):
+            if position == 0:
+                return 0
+            window_line_starts, folded_line_starts = line_starts()
+            return folded_line_starts[bisect.bisect_right(window_line_starts, position) - 1]
+
+        def to_original(hit):
+            window_line_starts, folded_line_starts = line_starts()
+            return window_line_starts[bisect.bisect_right(folded_line_starts, hit) - 1]
+        return bind_window(folded), to_folded, to_original
+
+    text_length = len(text)
+    # Hits starting in [window_start, window_end) are looked for in the current window
+    window_start = window_end = 0
+    search_window = to_folded = to_original = None
+
+    def find(position):
+        nonlocal window_start, window_end, search_window, to_folded, to_original
+        while position < text_length:
+            if not window_start <= position < window_end:
+                if cancelled is not None and cancelled():
+                    return -1
+                window_start = position
+                window_end = min(position + SCAN_CHUNK_SIZE, text_length)
+                search_window, to_folded, to_original = bind_folded_window(text[window_start:window_end + overlap])
+            if to_folded is None:
+                hit = search_window(position - window_start)
+            else:
+                # Only the hit's line matters to the caller, so its line start stands in for it
+                hit = search_window(to_folded(position - window_start))
+                hit = -1 if hit == -1 else max(to_original(hit), position - window_start)
+            if hit != -1:
+                return window_start + hit
+            position = window_end
+        return -1
+    return find
+
+def _iter_matching_lines(pattern, text, first_line_number=1, cancelled=None, start=0):
+    """
+    Runs pattern over a whole buffer instead of line by line.
+    Line numbers and line content are only worked out for the hits, by counting
+    newlines up to each match offset, so buffers with few hits stay in C code.
+    A _RegexPattern only finds candidate lines this way; each one is then checked against
+    the regex, so regular expressions match within a line.
+
+    Args:
+        pattern: The compiled search pattern from _compile_search (str or bytes, matching text).
+        text (str, bytes or mmap.mmap): The buffer to scan.
+        first_line_number (int): Line number of the line at start.
+        cancelled (callable, optional): Checked between SCAN_CHUNK_SIZE windows; the scan stops
+                                        once it returns True.
+        start (int): Offset of the line to start scanning at.
+
+    Yields:
+        tuple: (line_number, line_content, line_start), one per matching line, as they are found.
+               line_content has the same type as a slice of text, line_start is its offset in text.
+    """
+    newline = '\n' if isinstance(text, str) else b'\n'
+    line_number = first_line_number
+    counted_up_to = start
+    position = start
+    find = _bind_finder(pattern, text, cancelled)
+    is_regex = isinstance(pattern, _RegexPattern)
+    while True:
+        match_start = find(position)
+        if match_start == -1:
+            break
+        line_start = text.rfind(newline, 0, match_start) + 1
+        line_end = text.find(newline, match_start)
+        if line_end == -1:
+            line_end = len(text)
+        line = text[line_start:line_end]
+        if is_regex and pattern.regex.search(line if newline == '\n' else line.decode('utf-8', errors='ignore')) is None:
+            position = line_end + 1
+            continue
+        line_number += _count_newlines(text, counted_up_to, line_start)
+        counted_up_to = line_start
+        yield line_number, line, line_start
+        # Skip the rest of the line, a line is reported once however many hits it has
+        position = line_end + 1
+
+def _iter_line_aligned_chunks(f, chunk_size=SCAN_CHUNK_SIZE, first_line_number=1):
+    """
+    Reads an open file (text or binary) from its current position in large chunks cut at the
+    last newline. Yields (first_line_number, buffer) pairs so no line is split across buffers.
+    """
+    carry = None
+    line_number = first_line_number
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            if carry:
+                yield line_number, carry
+            return
+        newline = '\n' if isinstance(chunk, str) else b'\n'
+        buffer = chunk if carry is None else carry + chunk
+        cut = buffer.rfind(newline) + 1
+        if cut == 0:
+            # No newline yet, keep reading until the line ends
+            carry = buffer
+            continue
+        carry = buffer[cut:]
+        yield line_number, buffer[:cut]
+        line_number += buffer.count(newline, 0, cut)
+
+def _byte_offset(buffer, text, position):
+    """
+    Returns the offset in buffer of the line that starts at position in text, buffer being
+    bytes and text their decoding. Undecodable bytes are dropped but newlines never are, so the
+    line is found by its number.
+    """
+    return len(buffer) - len(buffer.split(b'\n', text.count('\n', 0, position))[-1])
+
+def _iter_mapped_file_matches(file_path, search_sentence, cancel_event=None, resume_at=None, stop_after=None):
+    """
+    Searches a large file by memory-mapping it and running a bytes pattern over the mapping.
+    Nothing is decoded except the matching lines, so decode cost and string allocation
+    no longer scale with the file size. Only valid for ASCII sentences, since bytes
+    are case-folded for ASCII letters only. Gives up between windows once the search is cancelled.
+    Yields the occurrences found in this file; resume_at and stop_after work as in
+    _iter_text_file_matches.
+    """
+    pattern = _compile_search(search_sentence, as_bytes=True)
+    file_path = sys.intern(file_path)
+    offset, line_number, hits = resume_at or _ResumePoint(0, 1, 0)
+
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, 'madvise'):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        matching_lines = _iter_matching_lines(pattern, mapped, line_number, functools.partial(_cancelled, cancel_event), offset)
+        for taken, (line_num, line, line_start) in enumerate(matching_lines):
+            if taken == stop_after:
+                yield _ResumePoint(line_start, line_num, hits + taken)
+                return
+            yield Match(file_path, line_num, line.decode('utf-8', errors='ignore').strip(), patterns=_matched_sentences(pattern, line))
+
+def _iter_file_ranges(file_path, file_size, range_size=None):
+    """
+    Cuts a file into (start, end) byte ranges of about range_size (FILE_RANGE_SIZE by default).
+    Every range but the last ends just after a newline, so no line is split between ranges
+    and no UTF-8 sequence either. Boundaries are found lazily, one short read each.
+    """
+    range_size = range_size or FILE_RANGE_SIZE
+    with open(file_path, 'rb') as f:
+        start = 0
+        while start < file_size:
+            end = start + range_size
+            if end >= file_size:
+                yield start, file_size
+                return
+            f.seek(end)
+            while True:
+                block = f.read(64 * 1024)
+                if not block:
+                    end = file_size
+                    break
+                newline = block.find(b'\n')
+                if newline != -1:
+                    end += newline + 1
+                    break
+                end += len(block)
+            yield start, end
+            start = end
+
+_worker_cancel_event = None
+
+def _init_worker(cancel_event):
+    """
+    Process pool initializer: keeps the search's cancel event where the worker functions can see it.
+    """
+    global _worker_cancel_event
+    _worker_cancel_event = cancel_event
+
+def _cancelled(cancel_event=None):
+    """
+    Returns True once the running search has been cancelled (e.g. its max_results was reached).
+    """
+    cancel_event = cancel_event or _worker_cancel_event
+    return cancel_event is not None and cancel_event.is_set()
+
+def _iter_buffer_matches(file_path, pattern, buffer, resume_at=None, stop_after=None):
+    """
+    Yields the occurrences of a compiled pattern in a str buffer read from file_path;
+    resume_at and stop_after work as in _iter_text_file_matches, with offsets in characters.
+    """
+    offset, line_number, hits = resume_at or _ResumePoint(0, 1, 0)
+    for taken, (line_num, line, line_start) in enumerate(_iter_matching_lines(pattern, buffer, line_number, start=offset)):
+        if taken == stop_after:
+            yield _ResumePoint(line_start, line_num, hits + taken)
+            return
+        yield Match(file_path, line_num, line.strip(), patterns=_matched_sentences(pattern, line))
+
+def _iter_text_file_matches(file_path, search_sentence, cancel_event=None, resume_at=None, stop_after=None):
+    """
+    Searches a single text file for a sentence and yields the occurrences as they are found.
+    The file is read as bytes in line-aligned chunks, each decoded on its own (a chunk ends on a
+    newline, so no character is split). Gives up between chunks once the search is cancelled.
+
+    Args:
+        file_path (str): The file to search.
+        search_sentence (str, list or re.Pattern): What to search for.
+        cancel_event (threading.Event, optional): Set once the search is cancelled.
+        resume_at (_ResumePoint, optional): Where an earlier task stopped; the search starts there.
+        stop_after (int, optional): Yield at most this many occurrences. If there is another hit
+                                    after them, its _ResumePoint is yielded last instead.
+    """
+    pattern = _compile_search(search_sentence)
+    file_path = sys.intern(file_path)
+    offset, line_number, hits = resume_at or _ResumePoint(0, 1, 0)
+
+    try:
+        if _is_ascii_search(search_sentence) and os.path.getsize(file_path) >= MMAP_MIN_SIZE:
+            yield from _iter_mapped_file_matches(file_path, search_sentence, cancel_event, resume_at, stop_after)
+            return
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            taken = 0
+            for first_line_number, buffer in _iter_line_aligned_chunks(f, first_line_number=line_number):
+                if _cancelled(cancel_event):
+                    return
+                text = buffer.decode('utf-8', errors='ignore')
+                for line_num, line, line_start in _iter_matching_lines(pattern, text, first_line_number):
+                    if taken == stop_after:
+                        yield _ResumePoint(offset + _byte_offset(buffer, text, line_start), line_num, hits + taken)
+                        return
+                    taken += 1
+                    yield Match(file_path, line_num, line.strip(), patterns=_matched_sentences(pattern, line))
+                offset += len(buffer)
+    except Exception as e:
+        # Print error on a new line to not interfere with progress bar
+        sys.stdout.write(f"\nError reading {file_path}: {e}\n")
+        sys.stdout.flush()
+
+def _search_text_batch(file_paths, search_sentence, max_hits=None, cancel_event=None, resume_at=None, texts=None):
+    """
+    Searches a batch of text files in one worker task, in order.
+    Runs inside the worker pool, so it only takes picklable arguments (cancel_event is
+    only passed to thread workers; process workers get theirs from _init_worker).
+    texts, if given, holds the text of each file already read by _prefetch_files (None for
+    files to read here). max_hits caps the occurrences taken from each file. The task returns
+    once it has TASK_MAX_HITS occurrences and another hit is found, leaving the rest to a
+    follow-up task that starts at resume_at in its first file.
+    Returns (occurrences, searched_count, rest), rest being None or the
+    (file_paths, texts, resume_at) still to search.
+    """
+    occurrences = []
+    searched_count = 0
+    for index, file_path in enumerate(file_paths):
+        if _cancelled(cancel_event):
+            break
+        file_resume_at = resume_at if index == 0 else None
+        hits_left = None if max_hits is None else max_hits - (file_resume_at.hits if file_resume_at else 0)
+        stop_after = TASK_MAX_HITS - len(occurrences)
+        if texts is not None and texts[index] is not None:
+            matches = _iter_buffer_matches(sys.intern(file_path), _compile_search(search_sentence), texts[index], file_resume_at, stop_after)
+        else:
+            matches = _iter_text_file_matches(file_path, search_sentence, cancel_event, file_resume_at, stop_after)
+        with contextlib.closing(matches):
+            for occurrence in itertools.islice(matches, hits_left):
+                if isinstance(occurrence, _ResumePoint):
+                    return occurrences, searched_count, (file_paths[index:], texts and texts[index:], occurrence)
+                occurrences.append(occurrence)
+        searched_count += 1
+    return occurrences, searched_count, None
+
+def _search_file_range(file_path, search_sentence, start, end, max_hits=None):
+    """
+    Searches bytes start..end of a file, as cut by _iter_file_ranges.
+    Runs in a process worker, so the ranges of one huge file are scanned on several cores.
+    Line numbers are relative to the start of the range; the caller adds the newlines of the
+    ranges before it. Once TASK_MAX_HITS occurrences are taken and another hit is found, the
+    task stops at that hit's line and leaves the rest of the range to a follow-up task.
+    Returns (occurrences, newline_count, rest): newline_count counts the newlines before rest,
+    which is None or the (start, end) byte range still to search.
+    """
+    file_path = sys.intern(file_path)
+    if _cancelled():
+        return [], 0, None
+    try:
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            buffer = f.read(end - start)
+    except Exception as e:
+        sys.stdout.write(f"\nError reading {file_path}: {e}\n")
+        sys.stdout.flush()
+        return [], 0, None
+
+    # ASCII searches run the same bytes search as the mmap path, only the matching lines get decoded
+    as_bytes = _is_ascii_search(search_sentence)
+    text = buffer if as_bytes else buffer.decode('utf-8', errors='ignore')
+    newline = b'\n' if as_bytes else '\n'
+    pattern = _compile_search(search_sentence, as_bytes)
+    occurrences = []
+    for line_num, line, line_start in itertools.islice(_iter_matching_lines(pattern, text, cancelled=_cancelled), max_hits):
+        if len(occurrences) == TASK_MAX_HITS:
+            resume_offset = line_start if as_bytes else _byte_offset(buffer, text, line_start)
+            return occurrences, text.count(newline, 0, line_start), (start + resume_offset, end)
+        line_content = line.decode('utf-8', errors='ignore') if as_bytes else line
+        occurrences.append(Match(file_path, line_num, line_content.strip(), patterns=_matched_sentences(pattern, line)))
+    return occurrences, text.count(newline), None
+
+_pdf_cache_connection = None
+# Process that opened _pdf_cache_connection: SQLite connections must not be used across fork()
+_pdf_cache_pid = None
+# Connections inherited from the parent through fork(). They are kept referenced and never used,
+# so they are not closed, because closing one in the child could checkpoint the parent's WAL.
+_inherited_pdf_cache_connections = []
+
+def _get_pdf_cache():
+    """
+    Opens (once per process) the SQLite database that holds extracted PDF text.
+    Returns None if the cache cannot be opened, in which case PDFs are simply re-extracted.
+    """
+    global _pdf_cache_connection, _pdf_cache_pid
+    import sqlite3
+
+    if _pdf_cache_pid != os.getpid():
+        # Forked pool worker: open its own connection instead of using the parent's
+        if _pdf_cache_connection:
+            _inherited_pdf_cache_connections.append(_pdf_cache_connection)
+        _pdf_cache_connection = None
+        _pdf_cache_pid = os.getpid()
+    if _pdf_cache_connection is None:
+        try:
+            os.makedirs(os.path.dirname(PDF_CACHE_PATH), exist_ok=True)
+            connection = sqlite3.connect(PDF_CACHE_PATH, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            if connection.execute("PRAGMA user_version").fetchone()[0] != PDF_CACHE_SCHEMA_VERSION:
+                connection.execute("DROP TABLE IF EXISTS pdf_text")
+                connection.execute(f"PRAGMA user_version = {PDF_CACHE_SCHEMA_VERSION}")
+            connection.execute("CREATE TABLE IF NOT EXISTS pdf_text (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, pages BLOB, stored_bytes INTEGER, last_used REAL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS pdf_text_last_used ON pdf_text (last_used)")
+            connection.commit()
+            _pdf_cache_connection = connection
+        except (OSError, sqlite3.Error) as e:
+            sys.stdout.write(f"\n  Warning: PDF text cache unavailable at '{PDF_CACHE_PATH}': {e}\n")
+            sys.stdout.flush()
+            _pdf_cache_connection = False
+    return _pdf_cache_connection or None
+
+def _load_cached_pdf_text(filepath, stat_result):
+    """
+    Returns the cached, compressed text of a PDF, or None when there is no entry for this
+    exact path, size and mtime. The text is the form-feed terminated pages, like pdftotext prints them.
+    """
+    import sqlite3
+
+    connection = _get_pdf_cache()
+    if connection is None:
+        return None
+    try:
+        row = connection.execute("SELECT pages FROM pdf_text WHERE path = ? AND size = ? AND mtime_ns = ?",
+                                 (filepath, stat_result.st_size, stat_result.st_mtime_ns)).fetchone()
+        if row is None:
+            return None
+        connection.execute("UPDATE pdf_text SET last_used = ? WHERE path = ?", (time.time(), filepath))
+        connection.commit()
+        return row[0]
+    except sqlite3.Error:
+        return None
+
+def _store_cached_pdf_text(filepath, stat_result, blob):
+    """
+    Stores the compressed text of a PDF, replacing any older entry for the path.
+    """
+    import sqlite3
+
+    connection = _get_pdf_cache()
+    if connection is None:
+        return
+    try:
+        connection.execute("INSERT OR REPLACE INTO pdf_text VALUES (?, ?, ?, ?, ?, ?)",
+                           (filepath, stat_result.st_size, stat_result.st_mtime_ns, blob, len(blob), time.time()))
+        connection.commit()
+    except sqlite3.Error:
+        pass
+
+def _evict_pdf_cache(max_bytes=PDF_CACHE_MAX_BYTES):
+    """
+    Deletes the least recently used cache entries until the cache is under max_bytes.
+    Run once per search by the parent process rather than after every insert.
+    """
+    import sqlite3
+
+    connection = _get_pdf_cache()
+    if connection is None:
+        return
+    try:
+        total_bytes = connection.execute("SELECT COALESCE(SUM(stored_bytes), 0) FROM pdf_text").fetchone()[0]
+        if total_bytes <= max_bytes:
+            return
+        evicted_paths = []
+        for path, stored_bytes in connection.execute("SELECT path, stored_bytes FROM pdf_text ORDER BY last_used"):
+            if total_bytes <= max_bytes:
+                break
+            evicted_paths.append((path,))
+            total_bytes -= stored_bytes
+        connection.executemany("DELETE FROM pdf_text WHERE path = ?", evicted_paths)
+        connection.commit()
+    except sqlite3.Error as e:
+        sys.stdout.write(f"\n  Warning: Could not trim the PDF text cache: {e}\n")
+        sys.stdout.flush()
+
+def _iter_form_feed_pages(chunks):
+    """
+    Splits a stream of text chunks into (page_number, text) tuples on form feeds.
+    pdftotext ends every page with a form feed, so only one page is held in memory at a time.
+    """
+    page_number = 1
+    carry = ''
+    for chunk in chunks:
+        pages = (carry + chunk).split('\f')
+        carry = pages.pop()
+        for page_text in pages:
+            yield page_number, page_text
+            page_number += 1
+    # Nothing follows the last page's form feed unless the output was cut short
+    if carry:
+        yield page_number, carry
+
+def _iter_decoded_chunks(byte_chunks):
+    """
+    Decodes a stream of UTF-8 byte chunks, even when a character is split across two chunks.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    for data in byte_chunks:
+        yield decoder.decode(data)
+    yield decoder.decode(b'', final=True)
+
+def _iter_cached_pdf_pages(blob):
+    """
+    Decompresses cached PDF text piece by piece and yields its (page_number, text) tuples.
+    """
+    decompressor = zlib.decompressobj()
+    def byte_chunks():
+        for offset in range(0, len(blob), PDF_READ_CHUNK_SIZE):
+            yield decompressor.decompress(blob[offset:offset + PDF_READ_CHUNK_SIZE])
+        yield decompressor.flush()
+    yield from _iter_form_feed_pages(_iter_decoded_chunks(byte_chunks()))
+
+def _iter_extracted_pdf_pages(filepath, on_page=None):
+    """
+    Extracts the text of a PDF page by page, falling back to PyPDF2 if pdftotext is missing.
+
+    pdftotext's stdout is read through a pipe in PDF_READ_CHUNK_SIZE pieces and scanned as it
+    arrives, so memory stays bounded by one page. If the caller stops iterating early (closes
+    the generator), pdftotext is killed instead of extracting the rest of the document.
+
+    Args:
+        filepath (str): The PDF to extract.
+        on_page (callable, optional): Called with the text of every page as it is extracted.
+
+    Yields:
+        tuple: (page_number, text) for every page.
+
+    Returns:
+        bool: True if the whole document was extracted, False if it could not be read.
+    """
+    import subprocess
+
+    def feed(page_text):
+        if on_page is not None:
+            on_page(page_text)
+
+    try:
+        # Call pdftotext to extract text, keeping its form-feed page breaks
+        process = subprocess.Popen(['pdftotext', '-enc', 'UTF-8', filepath, '-'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
     except FileNotFoundError:
         sys.stdout.write(f"\n  Warning: 'pdftotext' not found. Please install poppler-utils (e.g., 'sudo apt-get install poppler-utils' on Debian/Ubuntu, 'brew install poppler' on macOS) for faster PDF processing. Falling back to PyPDF2 for '{filepath}'.\n")
         sys.stdout.flush()
-        # Fallback to PyPDF2 if pdftotext is not found
+        # Fallback to PyPDF2 if pdftotext is not found, imported only now as it is slow to import
+        try:
+            import PyPDF2
+        except ImportError:
+            sys.stdout.write(f"\n  Warning: PyPDF2 is not installed either, skipping '{filepath}'.\n")
+            sys.stdout.flush()
+            return False
         try:
             with open(filepath, 'rb') as file:
                 reader = PyPDF2.PdfReader(file)
-                for page_num in range(len(reader.pages)):
-                    page = reader.pages[page_num]
-                    text = page.extract_text() if page.extract_text() else ""
-                    if text:
-                        lines = text.splitlines()
-                        for line_idx, line in enumerate(lines, 1):
-                            if pattern.search(line):
-                                file_occurrences.append({'file_path': filepath, 'page_number': page_num + 1, 'line_number': line_idx, 'line_content': line.strip()})
+                for page_num, page in enumerate(reader.pages):
+                    if _cancelled():
+                        return False
+                    text = page.extract_text() or ""
+                    feed(text)
+                    yield page_num + 1, text
+            return True
         except PyPDF2.errors.PdfReadError:
             sys.stdout.write(f"\n  Warning: Could not read PDF file '{filepath}' with PyPDF2. It might be corrupted or encrypted.\n")
             sys.stdout.flush()
         except Exception as e:
             sys.stdout.write(f"\n  An unexpected error occurred with PyPDF2 while processing '{filepath}': {e}\n")
             sys.stdout.flush()
+        return False
+
+    try:
+        # read1 returns whatever the pipe has, so pages are scanned as soon as pdftotext writes them
+        byte_chunks = iter(lambda: process.stdout.read1(PDF_READ_CHUNK_SIZE), b'')
+        for page_number, text in _iter_form_feed_pages(_iter_decoded_chunks(byte_chunks)):
+            if _cancelled():
+                # The search was cancelled, the finally block kills pdftotext
+                return False
+            feed(text)
+            yield page_number, text
+        if process.wait() != 0:
+            raise subprocess.CalledProcessError(process.returncode, process.args)
+        return True
     except subprocess.CalledProcessError as e:
         sys.stdout.write(f"\n  Error processing PDF '{filepath}' with pdftotext: {e}\n")
         sys.stdout.flush()
     except Exception as e:
         sys.stdout.write(f"\n  An unexpected error occurred while processing '{filepath}': {e}\n")
         sys.stdout.flush()
-    return file_occurrences
+    finally:
+        if process.poll() is None:
+            # Stopped early, the rest of the document isn't needed
+            process.kill()
+        process.wait()
+        process.stdout.close()
+    return False
+
+def _iter_pdf_pages(filepath, use_cache=True):
+    """
+    Yields the (page_number, text) tuples of a PDF, taken from the PDF text cache when the
+    file is unchanged and extracted otherwise. A fully extracted document is added to the cache,
+    compressed while it streams past; one abandoned part way through is not.
+    """
+    if use_cache:
+        try:
+            stat_result = os.stat(filepath)
+        except OSError:
+            use_cache = False
+        else:
+            blob = _load_cached_pdf_text(filepath, stat_result)
+            if blob is not None:
+                yield from _iter_cached_pdf_pages(blob)
+                return
+
+    if not use_cache:
+        yield from _iter_extracted_pdf_pages(filepath)
+        return
+
+    compressor = zlib.compressobj()
+    compressed = bytearray()
+    def add_to_cache(page_text):
+        compressed.extend(compressor.compress((page_text + '\f').encode('utf-8')))
+    if (yield from _iter_extracted_pdf_pages(filepath, add_to_cache)):
+        compressed.extend(compressor.flush())
+        _store_cached_pdf_text(filepath, stat_result, bytes(compressed))
+
+def _iter_pdf_matches(filepath, search_term, use_cache=True):
+    """
+    Searches a single PDF file for a term and yields the occurrences as they are found,
+    page by page, with line numbers counted from the top of each page.
+    Extracted text is taken from the PDF text cache when the file is unchanged.
+    """
+    pattern = _compile_search(search_term)
+    filepath = sys.intern(filepath)
+
+    with contextlib.closing(_iter_pdf_pages(filepath, use_cache)) as pages:
+        for page_number, text in pages:
+            for line_idx, line, _ in _iter_matching_lines(pattern, text):
+                yield Match(filepath, line_idx, line.strip(), page_number, _matched_sentences(pattern, line))
+
+def _search_single_pdf(filepath, search_term, use_cache=True, max_hits=None):
+    """
+    Helper function to search a single PDF file for a term using pdftotext.
+    Runs inside the worker pool, so it only takes picklable arguments.
+    Stops scanning (and kills pdftotext) once max_hits occurrences have been found, if given.
+    Returns a list of occurrences found in this file.
+    """
+    with contextlib.closing(_iter_pdf_matches(filepath, search_term, use_cache)) as matches:
+        return list(itertools.islice(matches, max_hits))
+
+def _search_pdf_batch(filepaths, search_term, use_cache=True, max_hits=None):
+    """
+    Searches a batch of PDFs in one worker task, so scheduling and pickling overhead is paid
+    once per batch instead of once per document. A failing PDF does not lose the rest of the batch.
+    max_hits caps the occurrences taken from each file.
+    Returns (occurrences, errors, searched_count), errors being (filepath, message) pairs.
+    """
+    occurrences = []
+    errors = []
+    searched_count = 0
+    for filepath in filepaths:
+        if _cancelled():
+            break
+        try:
+            occurrences.extend(_search_single_pdf(filepath, search_term, use_cache, max_hits))
+        except Exception as e:
+            errors.append((filepath, str(e)))
+        searched_count += 1
+    return occurrences, errors, searched_count
 
-def search_pdfs(folder_path, search_term):
+def _iter_search_tree(folder_path, search_sentence, file_extensions, workers=None, use_processes=False, use_pdf_cache=True, file_paths=None, no_files_message=None, max_results=None, files_with_matches=False, io_concurrency=None):
     """
-    Searches for a specific term within PDF files in a given folder and its subfolders using multiprocessing.
+    Walks folder_path once and dispatches every matching file to the text or PDF pipeline,
+    yielding occurrences as soon as they are collected.
+
+    PDFs always go to a process pool (pdftotext/PyPDF2 extraction), every other file goes to
+    the text pool, so PDF extraction overlaps with text scanning. Each pipeline keeps a bounded
+    window of futures, so nothing is accumulated beyond it however many files there are, and a
+    text task hands back at most TASK_MAX_HITS hits before a follow-up task takes over. Text
+    files are searched one per task on threads; a process pool gets size-balanced batches
+    (TEXT_BATCH_MAX_BYTES / TEXT_BATCH_MAX_FILES, big files alone) that only grow while every
+    worker is busy. Text tasks are collected from the front, keeping text results in walk
+    order; PDFs are sent in batches of PDF_BATCH_SIZE and collected as they complete, so one
+    slow PDF does not hold back the others. With workers=1 text files are streamed hit by hit.
+
+    Files of LARGE_FILE_SPLIT_SIZE or more are cut into line-aligned byte ranges searched by
+    worker processes (the PDF pool when text runs on threads). Ranges are collected in order
+    and their newline counts prefix-summed to turn range-relative line numbers into file ones.
+
+    With io_concurrency, the walk is replaced by _prefetch_files, which lists, stats and reads
+    files concurrently for high-latency filesystems. The text it read goes to the text pool
+    with the file (scanned right here with workers=1); PDFs and big files are read by the
+    pipelines above as usual.
+
+    Once max_results occurrences have been yielded, or the caller stops iterating, the walk
+    stops, queued futures are cancelled and running workers are told to give up, which
+    makes PDF workers kill their pdftotext.
+
+    Args:
+        folder_path (str): The folder to walk.
+        search_sentence (str or list): The exact sentence to search for, or a list of sentences matched in one pass.
+        file_extensions (list): Extensions (with the dot) to search; '.pdf' enables the PDF pipeline.
+        workers (int, optional): Workers per pipeline. Defaults to os.cpu_count(). 1 searches text inline.
+        use_processes (bool): Use a process pool for text files instead of threads.
+        use_pdf_cache (bool): Reuse and store extracted PDF text in the PDF text cache.
+        file_paths (iterable, optional): Files to search instead of walking folder_path.
+        no_files_message (str, optional): Printed when no file was found to search.
+        max_results (int, optional): Stop the whole search once this many occurrences have been yielded.
+        files_with_matches (bool): Stop reading each file at its first hit and yield one occurrence per file.
+        io_concurrency (int, optional): Walk and read through the asyncio pipeline, with this many
+                                        blocking filesystem calls in flight.
+
+    Yields:
+        Match: Occurrences; page_number is only set for PDFs.
+    """
+    text_pending = deque()
+    text_batch = []
+    text_batch_bytes = 0
+    # Future -> (number of PDFs, bytes) of its batch
+    pdf_pending = {}
+    pdf_batch = []
+    pdf_batch_bytes = 0
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 4
+    # The PDF window counts batches, so keep it to a couple of batches per worker
+    max_pdf_batches_in_flight = workers * 2
+    discovered_files_count = 0
+    searched_files_count = 0
+    searched_bytes = 0
+    current_file_path = ''
+    discovered_pdfs = False
+    results_count = 0
+    # Per-file hit cap handed to the workers
+    file_max_hits = 1 if files_with_matches else max_results
+    # Set to make running workers stop; process workers get theirs through the pool initializer.
+    # The process pools and their event are only created once a PDF, a split file or a
+    # process-pool text batch needs them, so other searches never start multiprocessing.
+    thread_cancel_event = threading.Event()
+    process_cancel_event = None
+    # 'text' and 'pdf' executors, created on first use
+    executors = {}
+
+    def scan_inline(matches, file_size):
+        nonlocal results_count, searched_files_count, searched_bytes
+        remaining = None if max_results is None else max_results - results_count
+        with contextlib.closing(matches) as matches:
+            for occurrence in itertools.islice(matches, 1 if files_with_matches else remaining):
+                results_count += 1
+                yield occurrence
+        searched_files_count += 1
+        searched_bytes += file_size
+
+    def render_progress():
+        # Runs on the progress ticker thread; only reads the counters
+        return (f"[{discovered_files_count} discovered / {searched_files_count} searched, "
+                f"{_format_throughput(searched_files_count, searched_bytes, started)}] - "
+                f"Processing: {os.path.basename(current_file_path)[:50]}...")
+
+    def collect_text():
+        nonlocal searched_files_count, searched_bytes
+        # file_range is None for a batch; for a range of a split file it is
+        # (file_path, [lines before the range])
+        future, batch_size, batch_bytes, file_range = text_pending.popleft()
+        try:
+            if file_range is None:
+                occurrences, searched_count, rest = future.result()
+                if rest is not None:
+                    # The task stopped at TASK_MAX_HITS: the rest of its batch is collected next,
+                    # ahead of the tasks submitted after it
+                    rest_paths, rest_texts, resume_at = rest
+                    future = get_executor('text').submit(_search_text_batch, rest_paths, search_sentence, file_max_hits, text_cancel_event, resume_at, rest_texts)
+                    text_pending.appendleft((future, batch_size - searched_count, batch_bytes, None))
+                    batch_size, batch_bytes = searched_count, 0
+            else:
+                file_path, split_file = file_range
+                occurrences, newline_count, rest = future.result()
+                occurrences = [occurrence._replace(line_number=occurrence.line_number + split_file[0]) for occurrence in occurrences]
+                split_file[0] += newline_count
+                if rest is not None:
+                    # Same for a range: what is left of it comes next
+                    text_pending.appendleft((submit_file_range(file_path, *rest), 0, rest[1] - rest[0], file_range))
+                    batch_bytes -= rest[1] - rest[0]
+        except Exception as e:
+            sys.stdout.write(f"\n  Error processing {batch_size} files: {e}\n")
+            sys.stdout.flush()
+            occurrences = []
+        searched_files_count += batch_size
+        searched_bytes += batch_bytes
+        return take_results(occurrences)
+
+    def submit_text_batch():
+        nonlocal text_batch_bytes
+        # text_batch holds (file_path, text or None) pairs; texts are only sent when some were prefetched
+        file_paths, texts = zip(*text_batch)
+        texts = texts if any(text is not None for text in texts) else None
+        future = get_executor('text').submit(_search_text_batch, file_paths, search_sentence, file_max_hits, text_cancel_event, None, texts)
+        text_pending.append((future, len(text_batch), text_batch_bytes, None))
+        text_batch.clear()
+        text_batch_bytes = 0
+        if len(text_pending) >= max_in_flight:
+            yield from collect_text()
+
+    def submit_file_range(file_path, start, end):
+        # Ranges of split files need processes to use several cores
+        return get_executor('text' if use_processes else 'pdf').submit(_search_file_range, file_path, search_sentence, start, end, file_max_hits)
+
+    def submit_file_ranges(file_path, file_size):
+        file_range = (file_path, [0])
+        try:
+            for range_number, (start, end) in enumerate(_iter_file_ranges(file_path, file_size)):
+                if limit_reached():
+                    return
+                # The file counts as searched once, with its first range
+                text_pending.append((submit_file_range(file_path, start, end), int(range_number == 0), end - start, file_range))
+                if len(text_pending) >= max_in_flight:
+                    yield from collect_text()
+        except OSError as e:
+            sys.stdout.write(f"\nError reading {file_path}: {e}\n")
+            sys.stdout.flush()
+
+    def add_text_file(file_path, text=None):
+        nonlocal text_batch_bytes
+        file_size = _file_size(file_path) if text is None else len(text)
+        if file_size >= LARGE_FILE_SPLIT_SIZE and not files_with_matches:
+            # files_with_matches stops at the first hit, which a sequential scan finds cheapest
+            if text_batch:
+                yield from submit_text_batch()
+            yield from submit_file_ranges(file_path, file_size)
+            return
+        if file_size >= TEXT_BATCH_MAX_BYTES and text_batch:
+            # Big files go alone; flush what came before to keep walk order
+            yield from submit_text_batch()
+        text_batch.append((file_path, text))
+        text_batch_bytes += file_size
+        # Threads have no IPC to amortize, so every file is a task of its own. Process batches
+        # are sent as soon as a worker is idle, so small trees still use every worker
+        if (not use_processes or text_batch_bytes >= TEXT_BATCH_MAX_BYTES or len(text_batch) >= TEXT_BATCH_MAX_FILES
+                or sum(not future.done() for future, _, _, _ in text_pending) < workers):
+            yield from submit_text_batch()
+
+    def take_results(occurrences):
+        nonlocal results_count
+        if max_results is not None:
+            occurrences = occurrences[:max_results - results_count]
+        results_count += len(occurrences)
+        return occurrences
+
+    def collect_pdfs(block):
+        """Collects every finished PDF batch, waiting for at least one if block is set."""
+        nonlocal searched_files_count, searched_bytes
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        done, _ = wait(pdf_pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            batch_size, batch_bytes = pdf_pending.pop(future)
+            try:
+                occurrences, errors, searched_count = future.result()
+            except Exception as e:
+                sys.stdout.write(f"\n  Error processing {batch_size} PDF files: {e}\n")
+                sys.stdout.flush()
+                occurrences, errors, searched_count = [], [], batch_size
+            for filepath, message in errors:
+                sys.stdout.write(f"\n  Error processing {filepath}: {message}\n")
+                sys.stdout.flush()
+            searched_files_count += searched_count
+            searched_bytes += batch_bytes
+            yield from take_results(occurrences)
+            if limit_reached():
+                return
+
+    def submit_pdf_batch():
+        nonlocal pdf_batch_bytes
+        pdf_pending[get_executor('pdf').submit(_search_pdf_batch, tuple(pdf_batch), search_sentence, use_pdf_cache, file_max_hits)] = (len(pdf_batch), pdf_batch_bytes)
+        pdf_batch.clear()
+        pdf_batch_bytes = 0
+        yield from collect_pdfs(block=len(pdf_pending) >= max_pdf_batches_in_flight)
+
+    def get_executor(kind):
+        nonlocal process_cancel_event
+        import concurrent.futures
+
+        if kind not in executors:
+            if kind == 'text' and not use_processes:
+                executors[kind] = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+            else:
+                if process_cancel_event is None:
+                    import multiprocessing
+                    process_cancel_event = multiprocessing.Event()
+                executors[kind] = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(process_cancel_event,))
+        return executors[kind]
+
+    def limit_reached():
+        return max_results is not None and results_count >= max_results
+
+    def cancel_pending():
+        thread_cancel_event.set()
+        if process_cancel_event is not None:
+            process_cancel_event.set()
+        for future in itertools.chain((future for future, _, _, _ in text_pending), pdf_pending):
+            future.cancel()
+        text_pending.clear()
+        text_batch.clear()
+        pdf_pending.clear()
+        pdf_batch.clear()
+
+    if file_paths is not None:
+        files = ((file_path, None) for file_path in file_paths)
+    elif io_concurrency:
+        files = _iter_prefetched_files(folder_path, file_extensions, io_concurrency)
+    else:
+        files = ((file_path, None) for file_path in _walk_files(folder_path, file_extensions))
+    pattern = _compile_search(search_sentence)
+
+    # Process workers check the pool's event instead
+    text_cancel_event = None if use_processes else thread_cancel_event
+    started = time.monotonic()
+    finish_progress = _start_progress(render_progress)
+    with contextlib.closing(files):
+        try:
+            for file_path, text in files:
+                if limit_reached():
+                    # Stop the directory walk as well
+                    break
+                discovered_files_count += 1
+                current_file_path = file_path
+                if file_path.lower().endswith('.pdf'):
+                    discovered_pdfs = True
+                    pdf_batch.append(file_path)
+                    pdf_batch_bytes += _file_size(file_path)
+                    if len(pdf_batch) >= PDF_BATCH_SIZE:
+                        yield from submit_pdf_batch()
+                elif workers == 1 and text is not None:
+                    yield from scan_inline(_iter_buffer_matches(sys.intern(file_path), pattern, text), len(text))
+                elif workers == 1:
+                    yield from scan_inline(_iter_text_file_matches(file_path, search_sentence), _file_size(file_path))
+                else:
+                    yield from add_text_file(file_path, text)
+            if text_batch and not limit_reached():
+                yield from submit_text_batch()
+            if pdf_batch and not limit_reached():
+                yield from submit_pdf_batch()
+            while text_pending and not limit_reached():
+                yield from collect_text()
+            while pdf_pending and not limit_reached():
+                yield from collect_pdfs(block=True)
+        finally:
+            # Also reached when the caller stops iterating early
+            cancel_pending()
+            for executor in executors.values():
+                executor.shutdown()
+            finish_progress()
+
+    if discovered_pdfs and use_pdf_cache:
+        _evict_pdf_cache()
+
+    if discovered_files_count:
+        finish_progress(f"[{discovered_files_count} discovered / {searched_files_count} searched, "
+                        f"{_format_throughput(searched_files_count, searched_bytes, started)}] - Done.")
+    elif no_files_message:
+        print(no_files_message)
+
+def iter_search_text_files(folder_path, search_sentence, file_extensions_to_search, workers=None, use_processes=False, files_with_matches=False, max_results=None, io_concurrency=None):
+    """
+    Searches through specified text files in a given folder for a specific sentence.
+    Files are streamed from the directory walker into a bounded queue of worker tasks,
+    and occurrences are yielded as they are found, so memory stays flat however many hits there are.
+    Includes a progress bar in the terminal.
+
+    Args:
+        folder_path (str): The absolute path to the folder containing files.
+        search_sentence (str or list): The exact sentence to search for, or a list of sentences to find
+                                       in one pass; each hit then lists the ones it matched in Match.patterns.
+        file_extensions_to_search (list): A list of file extensions (e.g., ['.txt', '.css', '.js'])
+                                           to include in the search. Extensions should include the dot.
+        workers (int, optional): Number of workers. Defaults to os.cpu_count(). 1 searches inline.
+        use_processes (bool): Use a process pool (CPU-bound regex) instead of threads (I/O-bound,
+                              e.g. NFS). Defaults to False.
+        files_with_matches (bool): Stop reading each file at its first match and yield one
+                                   occurrence per matching file.
+        max_results (int, optional): Stop the search (walk and workers) once this many occurrences have been found.
+        io_concurrency (int, optional): List, stat and read files through an asyncio pipeline with this
+                                        many filesystem calls in flight, for network mounts where
+                                        latency, not CPU, is the bottleneck.
+
+    Yields:
+        Match: Occurrences (file_path, line_number, line_content), in directory walk
+               order regardless of which worker finished first (in completion order
+               with io_concurrency).
+    """
+    if not os.path.isdir(folder_path):
+        print(f"Error: Folder not found at '{folder_path}'")
+        return
+
+    text_extensions = [ext for ext in file_extensions_to_search if ext != '.pdf']
+    print(f"Searching for {_format_search(search_sentence)} in files with extensions {text_extensions} under '{folder_path}'...")
+
+    yield from _iter_search_tree(folder_path, search_sentence, text_extensions, workers, use_processes,
+                                 no_files_message="No files matching the specified extensions found. Exiting.",
+                                 max_results=max_results, files_with_matches=files_with_matches, io_concurrency=io_concurrency)
+
+def search_text_files(folder_path, search_sentence, file_extensions_to_search, workers=None, use_processes=False, files_with_matches=False, max_results=None, io_concurrency=None):
+    """
+    Searches through specified text files in a given folder for a specific sentence.
+    Same as iter_search_text_files, but returns all occurrences at once.
+
+    Returns:
+        list: A list of Match records (file_path, line_number, line_content).
+    """
+    return list(iter_search_text_files(folder_path, search_sentence, file_extensions_to_search, workers, use_processes, files_with_matches, max_results, io_concurrency))
+
+def iter_search_pdfs(folder_path, search_term, workers=None, use_cache=True, max_results=None, files_with_matches=False):
+    """
+    Searches for a specific term within PDF files in a given folder and its subfolders using multiprocessing,
+    yielding occurrences as each PDF is finished.
     Prioritizes 'pdftotext' for speed, falls back to PyPDF2 if not available.
 
     Args:
         folder_path (str): The absolute path to the folder containing PDF files.
-        search_term (str): The word or sentence to search for.
+        search_term (str or list): The word or sentence to search for, or a list of them to find in one pass.
+        workers (int, optional): Number of worker processes. Defaults to os.cpu_count().
+        use_cache (bool): Reuse text extracted by earlier runs for PDFs whose size and mtime are unchanged.
+        max_results (int, optional): Stop the search once this many occurrences have been found.
+        files_with_matches (bool): Stop each PDF (and its pdftotext) at its first match and yield one
+                                   occurrence per matching PDF.
+
+    Yields:
+        Match: Occurrences (file_path, line_number, line_content, page_number).
+    """
+    if not os.path.isdir(folder_path):
+        print(f"Error: Folder not found at '{folder_path}'")
+        return
+
+    print(f"Searching for {_format_search(search_term)} in PDF files within '{folder_path}' and its subfolders (using multiprocessing and pdftotext/PyPDF2)...")
+
+    yield from _iter_search_tree(folder_path, search_term, ['.pdf'], workers, use_pdf_cache=use_cache,
+                                 no_files_message="No PDF files found. Exiting PDF search.", max_results=max_results,
+                                 files_with_matches=files_with_matches)
+
+def search_pdfs(folder_path, search_term, workers=None, use_cache=True, max_results=None, files_with_matches=False):
+    """
+    Searches for a specific term within PDF files in a given folder and its subfolders.
+    Same as iter_search_pdfs, but returns all occurrences at once.
 
     Returns:
-        list: A list of dictionaries, each containing 'file_path', 'page_number', 'line_number', and 'line_content'.
+        list: A list of Match records (file_path, line_number, line_content, page_number).
+    """
+    return list(iter_search_pdfs(folder_path, search_term, workers, use_cache, max_results, files_with_matches))
+
+def iter_search_files(folder_path, search_sentence, file_extensions_to_search, workers=None, use_processes=False, use_pdf_cache=True, files_with_matches=False, max_results=None, io_concurrency=None):
     """
-    all_found_occurrences = []
+    Searches text and PDF files in a single walk of the folder, yielding occurrences as they are found.
+    Each file is classified by extension once; PDFs are extracted concurrently with text scanning.
+
+    Args:
+        folder_path (str): The absolute path to the folder containing files.
+        search_sentence (str or list): The exact sentence to search for, or a list of sentences to find in one pass.
+        file_extensions_to_search (list): File extensions (with the dot) to search, '.pdf' included.
+        workers (int, optional): Workers per pipeline. Defaults to os.cpu_count().
+        use_processes (bool): Use a process pool for text files instead of threads.
+        use_pdf_cache (bool): Reuse text extracted by earlier runs for unchanged PDFs.
+        files_with_matches (bool): Stop reading each file at its first match and yield one
+                                   occurrence per matching file.
+        max_results (int, optional): Stop the search (walk, workers and pdftotext) once this many
+                                     occurrences have been found.
+        io_concurrency (int, optional): List, stat and read files through an asyncio pipeline with this
+                                        many filesystem calls in flight (see iter_search_text_files).
 
+    Yields:
+        Match: Occurrences as yielded by iter_search_text_files and iter_search_pdfs.
+    """
     if not os.path.isdir(folder_path):
         print(f"Error: Folder not found at '{folder_path}'")
-        return all_found_occurrences
+        return
+
+    print(f"Searching for {_format_search(search_sentence)} in files with extensions {file_extensions_to_search} under '{folder_path}'...")
 
-    print(f"Searching for '{search_term}' in PDF files within '{folder_path}' and its subfolders (using multiprocessing and pdftotext/PyPDF2)...")
+    yield from _iter_search_tree(folder_path, search_sentence, file_extensions_to_search, workers, use_processes, use_pdf_cache,
+                                 no_files_message="No files matching the specified extensions found. Exiting.",
+                                 max_results=max_results, files_with_matches=files_with_matches, io_concurrency=io_concurrency)
+
+def search_files(folder_path, search_sentence, file_extensions_to_search, workers=None, use_processes=False, use_pdf_cache=True, files_with_matches=False, max_results=None, io_concurrency=None):
+    """
+    Searches text and PDF files in a single walk of the folder.
+    Same as iter_search_files, but returns all occurrences at once.
+
+    Returns:
+        list: A list of Match records as returned by search_text_files and search_pdfs.
+    """
+    return list(iter_search_files(folder_path, search_sentence, file_extensions_to_search, workers, use_processes, use_pdf_cache, files_with_matches, max_results, io_concurrency))
+
+def _tokenize(text):
+    """
+    Splits text into case-folded index terms (runs of word characters).
+    """
+    return re.findall(r'\w+', text.casefold())
+
+def _encode_postings(line_keys):
+    """
+    Compresses a sorted list of line keys into delta-encoded varint bytes.
+    A line key is (page_number << 32) | line_number, so text files use page 0.
+    """
+    encoded = bytearray()
+    previous = 0
+    for line_key in line_keys:
+        delta = line_key - previous
+        previous = line_key
+        while delta >= 0x80:
+            encoded.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        encoded.append(delta)
+    return bytes(encoded)
+
+def _decode_postings(encoded):
+    """
+    Inverse of _encode_postings. Returns the list of line keys.
+    """
+    line_keys = []
+    current = 0
+    delta = 0
+    shift = 0
+    for byte in encoded:
+        delta |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        current += delta
+        line_keys.append(current)
+        delta = 0
+        shift = 0
+    return line_keys
+
+def _index_path(folder_path):
+    """
+    Returns the path of the index database for a folder.
+    """
+    import hashlib
 
-    pdf_files_to_process = []
-    for root, _, files in os.walk(folder_path):
-        for file_name in files:
-            if file_name.lower().endswith(".pdf"):
-                pdf_files_to_process.append(os.path.join(root, file_name))
+    folder_key = hashlib.sha1(os.path.abspath(folder_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(INDEX_DIR, f"{folder_key}.sqlite3")
 
-    if not pdf_files_to_process:
-        print("No PDF files found. Exiting PDF search.")
+def _open_index(folder_path):
+    """
+    Opens (creating it if needed) the index database for a folder.
+    """
+    import sqlite3
+
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    connection = sqlite3.connect(_index_path(folder_path), timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    if connection.execute("PRAGMA user_version").fetchone()[0] != INDEX_SCHEMA_VERSION:
+        for table in ('files', 'postings', 'trigrams'):
+            connection.execute(f"DROP TABLE IF EXISTS {table}")
+        connection.execute(f"PRAGMA user_version = {INDEX_SCHEMA_VERSION}")
+    connection.execute("CREATE TABLE IF NOT EXISTS files (file_id INTEGER PRIMARY KEY, path TEXT UNIQUE, size INTEGER, mtime_ns INTEGER, inode INTEGER)")
+    connection.execute("CREATE TABLE IF NOT EXISTS postings (term TEXT, file_id INTEGER, lines BLOB, PRIMARY KEY (term, file_id)) WITHOUT ROWID")
+    connection.execute("CREATE INDEX IF NOT EXISTS postings_file_id ON postings (file_id)")
+    connection.execute("CREATE TABLE IF NOT EXISTS trigrams (trigram TEXT, file_id INTEGER, PRIMARY KEY (trigram, file_id)) WITHOUT ROWID")
+    connection.execute("CREATE INDEX IF NOT EXISTS trigrams_file_id ON trigrams (file_id)")
+    connection.commit()
+    return connection
+
+def _trigrams(text):
+    """
+    Returns the set of three-character substrings of text, casefolded like the search matches
+    them (so STRASSE and straße share their trigrams).
+    """
+    text = text.casefold()
+    return set(map(''.join, zip(text, text[1:], text[2:])))
+
+def _iter_indexable_lines(file_path, use_pdf_cache=True):
+    """
+    Yields (page_number, line_number, line) for every line of a text file or PDF,
+    numbered the same way the search functions number them.
+    """
+    if file_path.lower().endswith('.pdf'):
+        for page_number, text in _iter_pdf_pages(file_path, use_pdf_cache):
+            for line_number, line in enumerate(text.split('\n'), 1):
+                yield page_number, line_number, line
+    else:
+        # Only \n ends a line, like in the scanners (iterating the file would also split on \r)
+        with open(file_path, 'r', encoding='utf-8', errors='ignore', newline='') as f:
+            for first_line_number, buffer in _iter_line_aligned_chunks(f):
+                for line_number, line in enumerate(buffer.removesuffix('\n').split('\n'), first_line_number):
+                    yield 0, line_number, line
+
+def _index_single_file(file_path, use_pdf_cache=True):
+    """
+    Helper function to tokenize a single file for the index.
+    Runs inside the worker pool, so it only takes picklable arguments.
+    Returns (file_path, stat_result, {term: encoded postings}, trigram set), or None if it can't be read.
+    """
+    try:
+        stat_result = os.stat(file_path)
+        term_lines = {}
+        file_trigrams = set()
+        for page_number, line_number, line in _iter_indexable_lines(file_path, use_pdf_cache):
+            line_key = (page_number << 32) | line_number
+            for term in set(_tokenize(line)):
+                term_lines.setdefault(term, []).append(line_key)
+            # Trigrams are taken per line, since a search sentence never spans lines
+            file_trigrams |= _trigrams(line.rstrip('\n'))
+    except Exception as e:
+        sys.stdout.write(f"\nError indexing {file_path}: {e}\n")
+        sys.stdout.flush()
+        return None
+    return file_path, stat_result, {term: _encode_postings(line_keys) for term, line_keys in term_lines.items()}, file_trigrams
+
+def _store_indexed_file(connection, indexed_file):
+    """
+    Writes the postings of one indexed file, replacing anything stored for its path before.
+    The file keeps its file_id across updates.
+    """
+    file_path, stat_result, postings, file_trigrams = indexed_file
+    connection.execute("INSERT INTO files (path, size, mtime_ns, inode) VALUES (?, ?, ?, ?) "
+                       "ON CONFLICT (path) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns, inode = excluded.inode",
+                       (file_path, stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino))
+    file_id = connection.execute("SELECT file_id FROM files WHERE path = ?", (file_path,)).fetchone()[0]
+    connection.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+    connection.executemany("INSERT INTO postings (term, file_id, lines) VALUES (?, ?, ?)",
+                           ((term, file_id, lines) for term, lines in postings.items()))
+    connection.execute("DELETE FROM trigrams WHERE file_id = ?", (file_id,))
+    connection.executemany("INSERT INTO trigrams (trigram, file_id) VALUES (?, ?)",
+                           ((trigram, file_id) for trigram in file_trigrams))
+
+def _remove_indexed_file(connection, file_id):
+    """
+    Drops a file and its postings from the index.
+    """
+    connection.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+    connection.execute("DELETE FROM trigrams WHERE file_id = ?", (file_id,))
+    connection.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+
+def build_index(folder_path, file_extensions_to_search=DEFAULT_EXTENSIONS, workers=None, use_pdf_cache=True, rebuild=False):
+    """
+    Builds or refreshes a persistent inverted index (term -> file/line postings) for a folder,
+    so repeated queries don't have to scan every file.
+
+    The index keeps a manifest of path, size, mtime and inode for every indexed file. A refresh
+    walks the folder with os.scandir, compares each file against the manifest and only
+    re-indexes files that were added or changed, and drops files that were deleted. Unchanged
+    files, PDFs included, are never re-read or re-extracted.
+
+    Args:
+        folder_path (str): The absolute path to the folder to index.
+        file_extensions_to_search (list): File extensions (with the dot) to index, '.pdf' included.
+        workers (int, optional): Number of worker processes. Defaults to os.cpu_count().
+        use_pdf_cache (bool): Reuse and store extracted PDF text in the PDF text cache.
+        rebuild (bool): Throw away the existing index and index every file again.
+
+    Returns:
+        int: The number of files (re)indexed.
+    """
+    if not os.path.isdir(folder_path):
+        print(f"Error: Folder not found at '{folder_path}'")
+        return 0
+
+    print(f"Indexing files with extensions {file_extensions_to_search} under '{folder_path}'...")
+
+    connection = _open_index(folder_path)
+    if rebuild:
+        connection.execute("DELETE FROM postings")
+        connection.execute("DELETE FROM trigrams")
+        connection.execute("DELETE FROM files")
+    manifest = {path: (file_id, size, mtime_ns, inode)
+                for file_id, path, size, mtime_ns, inode in connection.execute("SELECT file_id, path, size, mtime_ns, inode FROM files")}
+
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 4
+    pending = deque()
+    discovered_files_count = 0
+    indexed_files_count = 0
+    indexed_bytes = 0
+    unchanged_files_count = 0
+    current_file_name = ''
+
+    def collect():
+        nonlocal indexed_files_count, indexed_bytes
+        indexed_file = pending.popleft().result()
+        if indexed_file is not None:
+            _store_indexed_file(connection, indexed_file)
+            indexed_files_count += 1
+            indexed_bytes += indexed_file[1].st_size
+
+    def render_progress():
+        return (f"[{discovered_files_count} discovered / {indexed_files_count} indexed, "
+                f"{_format_throughput(indexed_files_count, indexed_bytes, started)}] - Processing: {current_file_name[:50]}...")
+
+    started = time.monotonic()
+    finish_progress = _start_progress(render_progress)
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for entry in _walk_file_entries(folder_path, file_extensions_to_search):
+            discovered_files_count += 1
+            current_file_name = entry.name
+            known_file = manifest.pop(entry.path, None)
+            if known_file is not None:
+                try:
+                    stat_result = entry.stat()
+                except OSError:
+                    continue
+                if known_file[1:] == (stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino):
+                    unchanged_files_count += 1
+                    continue
+            pending.append(executor.submit(_index_single_file, entry.path, use_pdf_cache))
+            if len(pending) >= max_in_flight:
+                collect()
+        while pending:
+            collect()
+
+    # Whatever is left in the manifest was not seen by the walk, so it was deleted
+    for file_id, _, _, _ in manifest.values():
+        _remove_indexed_file(connection, file_id)
+    connection.commit()
+    connection.close()
+
+    finish_progress(f"[{discovered_files_count} discovered / {indexed_files_count} indexed, "
+                    f"{_format_throughput(indexed_files_count, indexed_bytes, started)}] - Done.")
+    print(f"{indexed_files_count} files indexed, {unchanged_files_count} unchanged, {len(manifest)} removed.")
+    return indexed_files_count
+
+def query_index(folder_path, search_sentence, use_pdf_cache=True, files_with_matches=False, max_results=None):
+    """
+    Answers a case-insensitive phrase search from the index built by build_index.
+
+    The sentence is split into words; lines holding every word are found from the postings
+    alone. A one-word query is answered from the index without touching the files. Longer
+    phrases also need the words to be adjacent, so only the candidate lines are re-read and
+    checked against the phrase.
+
+    Args:
+        folder_path (str): The folder that was indexed.
+        search_sentence (str): The word or phrase to look for.
+        use_pdf_cache (bool): Use the PDF text cache when re-reading candidate PDFs.
+        files_with_matches (bool): Return only the first matching line of each file, and stop
+                                   re-reading a candidate file at its first verified line.
+        max_results (int, optional): Stop once this many occurrences have been found.
+
+    Returns:
+        list: A list of Match records like those of search_files. line_content is None for hits
+              answered from the index alone.
+    """
+    if not os.path.exists(_index_path(folder_path)):
+        print(f"Error: No index found for '{folder_path}'. Run the 'index' command first.")
         return []
 
-    print(f"Found {len(pdf_files_to_process)} PDF files to search. Processing in parallel...")
+    terms = _tokenize(search_sentence)
+    if not terms:
+        return []
+    # Repeated words are looked up once, but the phrase still needs every one of them
+    lookup_terms = list(dict.fromkeys(terms))
+
+    connection = _open_index(folder_path)
+    # Intersect the postings term by term, rarest term first
+    term_counts = {term: connection.execute("SELECT COUNT(*) FROM postings WHERE term = ?", (term,)).fetchone()[0] for term in lookup_terms}
+    candidates = None
+    for term in sorted(lookup_terms, key=term_counts.get):
+        term_postings = {}
+        for file_id, lines in connection.execute("SELECT file_id, lines FROM postings WHERE term = ?", (term,)):
+            if candidates is None or file_id in candidates:
+                line_keys = set(_decode_postings(lines))
+                if candidates is not None:
+                    line_keys &= candidates[file_id]
+                if line_keys:
+                    term_postings[file_id] = line_keys
+        candidates = term_postings
+        if not candidates:
+            break
+    file_paths = dict(connection.execute("SELECT file_id, path FROM files"))
+    connection.close()
 
-    with ProcessPoolExecutor() as executor:
-        futures = [executor.submit(_search_single_pdf, filepath, search_term) for filepath in pdf_files_to_process]
-        
-        for i, future in enumerate(futures):
+    found_occurrences = []
+    # The terms are casefolded, so check the phrase against casefolded lines (IGNORECASE alone
+    # would miss words like 'straße' that casefold changes)
+    phrase_pattern = re.compile(r'(?<!\w)' + r'\W+'.join(re.escape(term) for term in terms) + r'(?!\w)')
+    for file_id, line_keys in (candidates or {}).items():
+        if max_results is not None and len(found_occurrences) >= max_results:
+            break
+        file_path = sys.intern(file_paths[file_id])
+        is_pdf = file_path.lower().endswith('.pdf')
+        if len(terms) == 1:
+            matching_keys = [min(line_keys)] if files_with_matches else sorted(line_keys)
+            matching_lines = [(line_key >> 32, line_key & 0xFFFFFFFF, None) for line_key in matching_keys]
+        else:
             try:
-                occurrences = future.result()
-                all_found_occurrences.extend(occurrences)
-                sys.stdout.write(f"\rProcessed {i+1}/{len(pdf_files_to_process)} PDF files.")
+                with contextlib.closing(_iter_indexable_lines(file_path, use_pdf_cache)) as lines:
+                    matching_lines = list(itertools.islice(
+                        ((page_number, line_number, line.strip()) for page_number, line_number, line in lines
+                         if (page_number << 32) | line_number in line_keys and phrase_pattern.search(line.casefold())),
+                        1 if files_with_matches else None))
+            except OSError as e:
+                sys.stdout.write(f"\nError reading {file_path}: {e}\n")
                 sys.stdout.flush()
-            except Exception as e:
-                sys.stdout.write(f"\n  Error processing one PDF file: {e}\n")
-                sys.stdout.flush()
-    sys.stdout.write("\n") # Move to a new line after progress bar is complete
-    sys.stdout.flush()
+                continue
+        for page_number, line_number, line_content in matching_lines:
+            found_occurrences.append(Match(file_path, line_number, line_content, page_number if is_pdf else None))
+    return found_occurrences[:max_results]
 
-    return all_found_occurrences
+def _trigram_candidates(connection, search_sentence):
+    """
+    Returns the paths of indexed files whose trigram sets contain every trigram of the sentence.
+    Sentences shorter than three characters can't be narrowed down, so every indexed file is returned.
+    For a list of sentences, files that may hold any of them are returned; for a regular
+    expression, files holding all of its required literals.
+    """
+    if isinstance(search_sentence, re.Pattern):
+        literals = [literal for literal in _foldable_literals(search_sentence) if len(literal) >= 3]
+        if not literals:
+            return _trigram_candidates(connection, '')
+        return sorted(set.intersection(*(set(_trigram_candidates(connection, literal)) for literal in literals)))
+    if not isinstance(search_sentence, str):
+        return sorted(set().union(*(_trigram_candidates(connection, sentence) for sentence in search_sentence)))
+    needle_trigrams = sorted(_trigrams(search_sentence))[:MAX_QUERY_TRIGRAMS]
+    if not needle_trigrams:
+        return [path for (path,) in connection.execute("SELECT path FROM files ORDER BY path")]
+    placeholders = ', '.join('?' * len(needle_trigrams))
+    return [path for (path,) in connection.execute(
+        f"SELECT path FROM files WHERE file_id IN (SELECT file_id FROM trigrams WHERE trigram IN ({placeholders}) "
+        f"GROUP BY file_id HAVING COUNT(*) = ?) ORDER BY path",
+        (*needle_trigrams, len(needle_trigrams)))]
 
+def iter_search_indexed(folder_path, search_sentence, workers=None, use_processes=False, use_pdf_cache=True, files_with_matches=False, max_results=None):
+    """
+    Searches for a sentence like iter_search_files, but only scans the files that can contain it.
+    The folder's trigram index narrows the search down to files holding every trigram of the
+    sentence; only those candidates are read and scanned. Refresh the index (build_index)
+    after the folder changes, since files it doesn't know about are not searched.
 
-if __name__ == "__main__":
-    # Prompt user for the sentence to search
-    sentence_to_find = input("Write the word/sentence you want to look for: ")
+    Args:
+        folder_path (str): The folder that was indexed.
+        search_sentence (str or list): The exact sentence to search for, or a list of sentences.
+        workers (int, optional): Workers per pipeline. Defaults to os.cpu_count().
+        use_processes (bool): Use a process pool for text files instead of threads.
+        use_pdf_cache (bool): Reuse text extracted by earlier runs for unchanged PDFs.
+        files_with_matches (bool): Yield only the first occurrence of each matching file.
+        max_results (int, optional): Stop the search once this many occurrences have been found.
 
-    # Prompt user for the directory path
-    folder_to_search = input("Enter the absolute path to the directory where the files are located: ")
+    Yields:
+        Match: Occurrences as yielded by iter_search_files.
+    """
+    if not os.path.exists(_index_path(folder_path)):
+        print(f"Error: No index found for '{folder_path}'. Run the 'index' command first.")
+        return
+
+    connection = _open_index(folder_path)
+    candidate_paths = _trigram_candidates(connection, search_sentence)
+    indexed_files_count = connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+    connection.close()
+
+    print(f"Searching for {_format_search(search_sentence)} in {len(candidate_paths)} of {indexed_files_count} indexed files under '{folder_path}'...")
+    yield from _iter_search_tree(folder_path, search_sentence, None, workers, use_processes, use_pdf_cache, file_paths=candidate_paths,
+                                 max_results=max_results, files_with_matches=files_with_matches)
+
+def search_indexed(folder_path, search_sentence, workers=None, use_processes=False, use_pdf_cache=True, files_with_matches=False, max_results=None):
+    """
+    Searches for a sentence using the folder's trigram index.
+    Same as iter_search_indexed, but returns all occurrences at once.
+
+    Returns:
+        list: A list of Match records as returned by search_files.
+    """
+    return list(iter_search_indexed(folder_path, search_sentence, workers, use_processes, use_pdf_cache, files_with_matches, max_results))
+
+def _print_result(item):
+    """
+    Prints one search result as a colored, clickable (OSC 8) file link.
+    """
+    f_path = item.file_path
+
+    _, file_extension = os.path.splitext(f_path)
+    color_code = COLOR_MAP.get(file_extension.lower(), '37')
+
+     # Apply color to the visible text part of the hyperlink
+    colored_f_path = f"\033[{color_code}m{f_path}{RESET_COLOR}"
+
+    # Generate OSC 8 hyperlink for Kitty terminal
+    import urllib.parse
+
+    encoded_path = urllib.parse.quote(f_path)
+    hyperlink = f"\x1b]8;;file://{encoded_path}\x1b\\{colored_f_path}\x1b]8;;\\"
+    if item.patterns:
+        # Multi-sentence search: say which sentences the hit matched
+        hyperlink += f" [{', '.join(item.patterns)}]"
+    print(hyperlink)
 
-    # --- Configure the file extensions to search ---
-    extensions = ['.html', '.htm', '.txt', '.css', '.js', '.py', '.md', '.xml', '.json', '.log', '.csv', '.sh', '.yml', '.yaml', '.conf', '.pdf']
-    # ---------------------------------------------
+def _print_summary(results_count, files_count):
+    """
+    Prints how many hits were found, and in how many files.
+    """
+    if results_count == files_count:
+        print(f"\nFound the sentence in {files_count} files.")
+    else:
+        print(f"\nFound the sentence {results_count} times in {files_count} files.")
+
+def print_results(all_results):
+    """
+    Prints search results as colored, clickable (OSC 8) file links, sorted by file, page and line.
+
+    Returns:
+        int: The number of results printed.
+    """
+    if all_results:
+        print("\n--- Files containing the sentence (click to open) ---\n")
+        # Sort results for better readability (e.g., by file path, then line number)
+        all_results.sort(key=lambda x: (x.file_path, x.page_number or 0, x.line_number))
 
-    if not sentence_to_find.strip():
-        print("Error: Search sentence cannot be empty.")
-    elif not folder_to_search.strip():
-        print("Error: Directory path cannot be empty.")
+        for item in all_results:
+            _print_result(item)
+        _print_summary(len(all_results), len({item.file_path for item in all_results}))
     else:
-        # Search text files
-        text_file_results = search_text_files(folder_to_search, sentence_to_find, [ext for ext in extensions if ext != '.pdf'])
-        
-        # Search PDF files
-        pdf_file_results = search_pdfs(folder_to_search, sentence_to_find)
-
-        # Combine results
-        all_results = text_file_results + pdf_file_results
-
-        if all_results:
-            print("\n--- Files containing the sentence (click to open) ---\n")
-            # Sort results for better readability (e.g., by file path, then line number)
-            all_results.sort(key=lambda x: (x['file_path'], x.get('page_number', 0), x['line_number']))
-
-            for item in all_results:
-                f_path = item['file_path']
-                line_num = item['line_number']
-                page_info = f" (Page {item['page_number']})" if 'page_number' in item else ""
-
-                _, file_extension = os.path.splitext(f_path)
-                color_code = COLOR_MAP.get(file_extension.lower(), '37')
-
-                 # Apply color to the visible text part of the hyperlink
-                colored_f_path = f"\033[{color_code}m{f_path}{RESET_COLOR}"
-
-                # Generate OSC 8 hyperlink for Kitty terminal
-                encoded_path = urllib.parse.quote(f_path)
-                hyperlink = f"\x1b]8;;file://{encoded_path}\x1b\\{colored_f_path}\x1b]8;;\\"
-                print(hyperlink)
-            print(f"\nFound the sentence in {len(all_results)} files.")
+        print("\nNo files found containing the specified sentence.")
+    return len(all_results)
+
+def print_results_streaming(results):
+    """
+    Prints search results as they arrive from an iter_search_* generator, unsorted.
+    Only the running count and the paths of matching files are kept, not the results, so memory
+    grows with the number of matching files rather than the number of hits.
+
+    Returns:
+        int: The number of results printed.
+    """
+    results_count = 0
+    matching_files = set()
+    for item in results:
+        with _output_lock:
+            # Clear the progress bar line before printing over it
+            sys.stdout.write("\r\x1b[K")
+            _print_result(item)
+        results_count += 1
+        matching_files.add(item.file_path)
+    if results_count:
+        _print_summary(results_count, len(matching_files))
+    else:
+        print("\nNo files found containing the specified sentence.")
+    return results_count
+
+def print_results_plain(results, out=None, files_only=False):
+    """
+    Prints search results as they arrive, one grep-style line each and nothing else, for
+    pipelines (xargs, sort, ...): path:line:content, or path:page:line:content for PDFs.
+    content is empty for index hits that carry no line text (one-word query_index searches).
+
+    Args:
+        results (iterable): Match records, e.g. from an iter_search_* generator.
+        out (file, optional): Where to write. Defaults to sys.stdout.
+        files_only (bool): Print each matching file's path once instead of its lines.
+
+    Returns:
+        int: The number of results printed.
+    """
+    out = out or sys.stdout
+    results_count = 0
+    for item in results:
+        line_content = item.line_content or ''
+        if files_only:
+            out.write(f"{item.file_path}\n")
+        elif item.page_number is not None:
+            out.write(f"{item.file_path}:{item.page_number}:{item.line_number}:{line_content}\n")
         else:
-            print("\nNo files found containing the specified sentence.")
+            out.write(f"{item.file_path}:{item.line_number}:{line_content}\n")
+        results_count += 1
+    out.flush()
+    return results_count
+
+def print_results_json(results, out=None):
+    """
+    Prints search results as they arrive as JSON Lines: one object per result with the keys
+    path, line, page (null outside PDFs), text (empty for index hits that carry no line text)
+    and patterns (null unless several sentences were searched).
+
+    Args:
+        results (iterable): Match records, e.g. from an iter_search_* generator.
+        out (file, optional): Where to write. Defaults to sys.stdout.
+
+    Returns:
+        int: The number of results printed.
+    """
+    import json
+
+    out = out or sys.stdout
+    results_count = 0
+    for item in results:
+        out.write(json.dumps({'path': item.file_path, 'line': item.line_number, 'page': item.page_number,
+                              'text': item.line_content or '', 'patterns': item.patterns}, ensure_ascii=False) + "\n")
+        results_count += 1
+    out.flush()
+    return results_count
+
+def _parse_extensions(values):
+    """
+    Turns --ext values ('log', '.txt', 'md,csv', ...) into lower-case extensions with the dot.
+    """
+    extensions = []
+    for value in values:
+        for extension in value.split(','):
+            extension = extension.strip().lower()
+            if extension:
+                extensions.append(extension if extension.startswith('.') else '.' + extension)
+    return extensions
+
+def _positive_int(value):
+    """
+    argparse type for counts that must be at least 1.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+def _add_search_options(parser, for_commands=False):
+    """
+    Adds the search options to parser. The index/query commands (for_commands) leave out
+    -e/-f, whose sentences would clash with query's SENTENCE, and --io-concurrency, which
+    they don't use, so those are rejected there instead of silently ignored.
+    """
+    parser.add_argument('--stream', action='store_true', help="Print results as they are found instead of sorted at the end.")
+    parser.add_argument('-l', '--files-with-matches', action='store_true', help="Stop reading each file at its first match and list every matching file once.")
+    parser.add_argument('-m', '--max-count', type=_positive_int, metavar='N', help="Stop searching once N results have been found.")
+    if not for_commands:
+        parser.add_argument('-e', '--sentence', action='append', help="Sentence to search for; every positional argument is then a path. Repeat to search for several sentences in one pass.")
+        parser.add_argument('-f', '--sentences-file', metavar='FILE', help="Search for every sentence in FILE (one per line) in one pass.")
+        parser.add_argument('--io-concurrency', type=_positive_int, metavar='N', help="List and read files with N concurrent filesystem calls (helps on NFS/SMB and other high-latency mounts).")
+    parser.add_argument('--regex', action='store_true', help="Treat the sentence as a case-insensitive regular expression, matched line by line.")
+    parser.add_argument('--ext', action='append', metavar='EXT', help="Only search files with this extension (e.g. log or .log,txt). Repeatable. Defaults to the usual text extensions and .pdf.")
+    parser.add_argument('-w', '--workers', type=_positive_int, metavar='N', help="Workers per pipeline. Defaults to the number of CPUs.")
+    parser.add_argument('--processes', action='store_true', help="Search text files in worker processes instead of threads.")
+    parser.add_argument('--no-pdf-cache', dest='use_pdf_cache', action='store_false', help="Extract every PDF again instead of reusing the PDF text cache.")
+    parser.add_argument('--json', action='store_true', help="Print one JSON object per result (JSON Lines) for other programs to read.")
+    parser.add_argument('--banner', action=argparse.BooleanOptionalAction, help="Print the banner. Defaults to on only when run interactively in a terminal.")
+
+def _build_arg_parsers():
+    """
+    Builds the parser for searches (PATTERN [PATH ...]) and the one for the index/query commands.
+    Both share the search options, which the commands take before or after the command name.
+    """
+    options = argparse.ArgumentParser(add_help=False)
+    _add_search_options(options)
+    leading_command_options = argparse.ArgumentParser(add_help=False)
+    _add_search_options(leading_command_options, for_commands=True)
+    # The subcommands' copy leaves unset options out, so it does not reset options given before the command
+    command_options = argparse.ArgumentParser(add_help=False, argument_default=argparse.SUPPRESS)
+    _add_search_options(command_options, for_commands=True)
+
+    search_parser = argparse.ArgumentParser(
+        parents=[options], usage="%(prog)s [options] [PATTERN] [PATH ...]\n       %(prog)s [options] {index,query} ...",
+        description="Find a word or sentence in text and PDF files under each PATH (directories are searched "
+                    "recursively, the current directory by default). Run without a pattern in a terminal to be prompted. "
+                    "Exits with 0 if something was found, 1 if not and 2 on errors.",
+        epilog="Commands: 'index FOLDER [--rebuild]' builds a persistent index of a folder, "
+               "'query FOLDER SENTENCE [--substring]' answers a search from it.")
+    search_parser.add_argument('pattern_and_paths', nargs='*', metavar='PATTERN [PATH ...]', help="Sentence to look for, then the files or folders to search.")
+
+    command_parser = argparse.ArgumentParser(parents=[leading_command_options], description="Build or query a folder's persistent index.")
+    subparsers = command_parser.add_subparsers(dest='command', required=True)
+    index_parser = subparsers.add_parser('index', parents=[command_options], help="Build a persistent index of a folder for fast repeated queries.")
+    index_parser.add_argument('folder', help="Absolute path to the folder to index.")
+    index_parser.add_argument('--rebuild', action='store_true', help="Re-index every file instead of only added or changed ones.")
+    query_parser = subparsers.add_parser('query', parents=[command_options], help="Answer a case-insensitive phrase search from a folder's index.")
+    query_parser.add_argument('folder', help="Absolute path to the indexed folder.")
+    query_parser.add_argument('sentence', help="Word or phrase to look for.")
+    query_parser.add_argument('--substring', action='store_true', help="Match the sentence anywhere, like a normal search, scanning only the files the trigram index allows.")
+    return search_parser, command_parser
+
+def _iter_search_paths(paths, search_sentence, file_extensions, args):
+    """
+    Searches each path given on the command line in turn: folders are walked, files named
+    directly are searched whatever their extension. --max-count applies to all of them together.
+    """
+    remaining = args.max_count
+    files = []
+    searches = []
+    for path in paths:
+        if os.path.isdir(path):
+            searches.append(functools.partial(iter_search_files, path, search_sentence, file_extensions, args.workers, args.processes,
+                                              args.use_pdf_cache, files_with_matches=args.files_with_matches,
+                                              io_concurrency=args.io_concurrency))
+        else:
+            files.append(path)
+    if files:
+        searches.append(functools.partial(_iter_search_tree, None, search_sentence, file_extensions, args.workers, args.processes,
+                                          args.use_pdf_cache, file_paths=files, files_with_matches=args.files_with_matches))
+
+    for search in searches:
+        if remaining is not None and remaining <= 0:
+            break
+        for match in search(max_results=remaining):
+            yield match
+            if remaining is not None:
+                remaining -= 1
+
+def _print_cli_results(results, args, out):
+    """
+    Prints results the way the command line was asked to, returning how many there were:
+    colored links (sorted unless --stream) when out is a terminal, otherwise streamed as
+    plain lines, or as JSON Lines with --json.
+    """
+    if args.json:
+        return print_results_json(results, out)
+    if not out.isatty():
+        return print_results_plain(results, out, files_only=args.files_with_matches)
+    if args.stream:
+        return print_results_streaming(results)
+    return print_results(list(results))
+
+def main(argv=None):
+    """
+    Runs the command line. Everything can be given as arguments, so it runs unattended from
+    cron, xargs or batch jobs; only a run in a terminal with no pattern prompts for input.
+
+    Returns:
+        int: The exit status: 0 if something was found, 1 if not, 2 on errors.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    search_parser, command_parser = _build_arg_parsers()
+    # The options may come before a command, so find the first positional argument to tell
+    # a search from an index/query command
+    peek, _ = search_parser.parse_known_args([arg for arg in argv if arg not in ('-h', '--help')])
+    is_command = bool(peek.pattern_and_paths) and peek.pattern_and_paths[0] in ('index', 'query')
+    # Searches allow options anywhere, e.g. between PATTERN and PATH
+    args = command_parser.parse_args(argv) if is_command else search_parser.parse_intermixed_args(argv)
+
+    interactive_input = sys.stdin.isatty()
+    out = sys.stdout
+    # Outside a terminal (or with --json) stdout only carries results: status messages,
+    # prompts and the progress line go to stderr
+    results_only = args.json or not out.isatty()
+    if args.banner or (args.banner is None and interactive_input and not results_only):
+        _print_banner()
+
+    file_extensions = _parse_extensions(args.ext) if args.ext else DEFAULT_EXTENSIONS
+
+    with contextlib.redirect_stdout(sys.stderr) if results_only else contextlib.nullcontext():
+        try:
+            return _run_cli(args, search_parser, is_command, file_extensions, interactive_input, out)
+        except BrokenPipeError:
+            # The reader (head, grep -q, ...) is gone: stop quietly like other command-line tools,
+            # pointing stdout at devnull so the interpreter's final flush does not fail again
+            os.dup2(os.open(os.devnull, os.O_WRONLY), out.fileno())
+            return 0
+        except KeyboardInterrupt:
+            return 130
+
+def _run_cli(args, search_parser, is_command, file_extensions, interactive_input, out):
+    """
+    Runs the command or search parsed by main and returns its exit status.
+    """
+    if is_command and not os.path.isdir(args.folder):
+        sys.stderr.write(f"Error: Folder not found at '{args.folder}'\n")
+        return 2
+    if is_command and args.command == 'index':
+        build_index(args.folder, file_extensions, args.workers, args.use_pdf_cache, rebuild=args.rebuild)
+        return 0
+
+    if is_command:
+        if not os.path.exists(_index_path(args.folder)):
+            sys.stderr.write(f"Error: No index found for '{args.folder}'. Run the 'index' command first.\n")
+            return 2
+        if args.regex and args.substring:
+            try:
+                args.sentence = re.compile(args.sentence, re.IGNORECASE)
+            except re.error as e:
+                sys.stderr.write(f"Error: Invalid regular expression: {e}\n")
+                return 2
+        elif args.regex:
+            sys.stderr.write("Error: --regex needs --substring, the word index only answers plain phrases.\n")
+            return 2
+
+        if args.substring:
+            results = iter_search_indexed(args.folder, args.sentence, args.workers, args.processes, args.use_pdf_cache,
+                                          files_with_matches=args.files_with_matches, max_results=args.max_count)
+        else:
+            results = query_index(args.folder, args.sentence, args.use_pdf_cache,
+                                       files_with_matches=args.files_with_matches, max_results=args.max_count)
+        return 0 if _print_cli_results(results, args, out) else 1
+
+    sentences = list(args.sentence or [])
+    if args.sentences_file:
+        try:
+            with open(args.sentences_file, encoding='utf-8') as f:
+                sentences.extend(line.strip() for line in f if line.strip())
+        except OSError as e:
+            sys.stderr.write(f"Error: Could not read the sentences file: {e}\n")
+            return 2
+    paths = list(args.pattern_and_paths)
+    if not sentences and paths:
+        sentences.append(paths.pop(0))
+
+    if not sentences:
+        if not interactive_input:
+            search_parser.error("a PATTERN (or -e/-f) is required when not run interactively")
+        # Prompt user for the sentence to search
+        sentences.append(input("Write the word/sentence you want to look for: "))
+        paths.append(input("Enter the absolute path to the directory where the files are located: "))
+    elif not paths and interactive_input and not args.pattern_and_paths:
+        # Sentences given with -e/-f only, as before: ask for the folder
+        paths.append(input("Enter the absolute path to the directory where the files are located: "))
+    elif not paths:
+        paths.append('.')
+
+    sentence_to_find = sentences if len(sentences) > 1 else sentences[0]
+    if not all(sentence.strip() for sentence in sentences):
+        sys.stderr.write("Error: Search sentence cannot be empty.\n")
+        return 2
+    if not all(path.strip() for path in paths):
+        sys.stderr.write("Error: Directory path cannot be empty.\n")
+        return 2
+    missing_paths = [path for path in paths if not os.path.exists(path)]
+    for path in missing_paths:
+        sys.stderr.write(f"Error: No such file or folder: '{path}'\n")
+    paths = [path for path in paths if path not in missing_paths]
+    if args.regex:
+        if not isinstance(sentence_to_find, str):
+            sys.stderr.write("Error: --regex takes a single pattern.\n")
+            return 2
+        try:
+            sentence_to_find = re.compile(sentence_to_find, re.IGNORECASE)
+        except re.error as e:
+            sys.stderr.write(f"Error: Invalid regular expression: {e}\n")
+            return 2
+
+    # Search text and PDF files in a single walk of each folder
+    found = _print_cli_results(_iter_search_paths(paths, sentence_to_find, file_extensions, args), args, out)
+    if missing_paths:
+        return 2
+    return 0 if found else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Compares the literal search path (_LiteralPattern, casefolded find) with the IGNORECASE
+regex it replaces, on synthetic buffers. Before timing anything it checks the windowed
+matcher against a line-by-line casefold() reference, with a small SCAN_CHUNK_SIZE so hits
+land on window edges. Run from the repository root:
+
+    python benchmarks/literal_search.py
+"""
+import importlib.util
+import os
+import random
+import re
+import time
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Text-finder.py')
+
+def load_text_finder():
+    spec = importlib.util.spec_from_file_location('text_finder', SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def make_buffer(line_count, hit_every, extra_word=''):
+    random.seed(0)
+    words = ['alpha', 'Beta', 'gamma', 'DELTA', 'log', 'request', 'served', 'in', 'ms', extra_word]
+    lines = []
+    for line_number in range(line_count):
+        line = ' '.join(random.choice(words) for _ in range(12))
+        if hit_every and line_number % hit_every == 0:
+            line += ' Needle In The Haystack'
+        lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+def check_against_reference(tf):
+    """
+    Asserts that single sentences, sentence lists (with and without the Aho-Corasick
+    automaton) and their bytes forms find exactly the lines a casefold() of each line does.
+    """
+    random.seed(1)
+    words = ['alpha', 'Stra\xdfe', 'STRASSE', 'strasse', 'gr\xf6\xdfe', 'GR\xd6SSE', '\ufb01le', 'FILE',
+             '\u212aelvin', 'Kelvin', 'log', '\u0130stanbul', 'istanbul', 'xxx', 'na\xefve', 'NA\xcfVE', '\u03c2', '\u03a3']
+    lines = [' '.join(random.choice(words) for _ in range(random.randint(0, 8))) for _ in range(20000)]
+    text = '\n'.join(lines) + '\n'
+    searches = [['strasse'], ['Stra\xdfe'], ['file'], ['\ufb01le'], ['kelvin'], ['gr\xf6\xdfe'], ['na\xefve'],
+                ['\u03c3'], ['istanbul'], ['strasse', 'na\xefve'], ['file', 'kelvin', 'xxx']]
+
+    chunk_size = tf.SCAN_CHUNK_SIZE
+    tf.SCAN_CHUNK_SIZE = 4096
+    try:
+        for sentences in searches:
+            expected = [line_number for line_number, line in enumerate(lines, 1)
+                        if any(sentence.casefold() in line.casefold() for sentence in sentences)]
+            search = sentences[0] if len(sentences) == 1 else sentences
+            buffers = [(False, text)]
+            if all(sentence.isascii() for sentence in sentences):
+                buffers.append((True, text.encode('utf-8')))
+            for as_bytes, buffer in buffers:
+                patterns = [tf._compile_search(search, as_bytes)]
+                if len(sentences) > 1:
+                    # The find() fallback used without pyahocorasick
+                    patterns.append(patterns[0]._replace(automaton=None))
+                for pattern in patterns:
+                    found = [line_number for line_number, _, _ in tf._iter_matching_lines(pattern, buffer)]
+                    assert found == expected, f"{sentences} ({'bytes' if as_bytes else 'str'}): differs from casefold()"
+    finally:
+        tf.SCAN_CHUNK_SIZE = chunk_size
+    print(f"Matches casefold() line by line for {len(searches)} searches.\n")
+
+def best_of(runs, function):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    tf = load_text_finder()
+    check_against_reference(tf)
+    sentence = 'needle in the haystack'
+    cases = [
+        ('ASCII, rare hits', make_buffer(200000, 10000)),
+        ('ASCII, frequent hits', make_buffer(200000, 10)),
+        ('non-ASCII text', make_buffer(200000, 10000, 'grüne')),
+        ('non-ASCII text with ß', make_buffer(200000, 10000, 'größe')),
+    ]
+    regex = re.compile(re.escape(sentence), re.IGNORECASE)
+    literal = tf._compile_search(sentence)
+    bytes_regex = re.compile(re.escape(sentence.encode('ascii')), re.IGNORECASE)
+    bytes_literal = tf._compile_search(sentence, as_bytes=True)
+
+    print(f"{'buffer':<24}{'type':<7}{'regex':>10}{'literal':>10}{'speedup':>9}")
+    for name, text in cases:
+        for type_name, buffer, old, new in (('str', text, regex, literal),
+                                            ('bytes', text.encode('utf-8'), bytes_regex, bytes_literal)):
+            old_time, old_hits = best_of(5, lambda: list(tf._iter_matching_lines(old, buffer)))
+            new_time, new_hits = best_of(5, lambda: list(tf._iter_matching_lines(new, buffer)))
+            assert old_hits == new_hits, f"{name} ({type_name}): results differ"
+            print(f"{name:<24}{type_name:<7}{old_time * 1000:>8.1f}ms{new_time * 1000:>8.1f}ms{old_time / new_time:>8.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Measures how long a short command-line search takes to get going: the time from starting
+the interpreter to the first read of the file being searched, against STARTUP_BUDGET_MS,
+plus what importing the module costs and what some of the imports that are now deferred
+(PDF fallback, banner, asyncio, worker pools, SQLite) would add. Run from the repository root:
+
+    python benchmarks/startup.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Text-finder.py')
+STARTUP_BUDGET_MS = 50
+RUNS = 7
+
+# Runs the script as __main__ and prints the wall-clock time of the first open() of the
+# searched file to stderr
+FIRST_READ_PROBE = """
+import builtins, os, runpy, sys, time
+script, target = sys.argv[1], os.path.abspath(sys.argv[-1])
+real_open = builtins.open
+def probe_open(file, *args, **kwargs):
+    if isinstance(file, str) and os.path.abspath(file) == target:
+        builtins.open = real_open
+        sys.stderr.write(f"first-read {time.time()}\\n")
+    return real_open(file, *args, **kwargs)
+builtins.open = probe_open
+sys.argv = sys.argv[1:]
+runpy.run_path(script, run_name='__main__')
+"""
+
+IMPORT_MODULE = """
+import importlib.util
+spec = importlib.util.spec_from_file_location('text_finder', {path!r})
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+"""
+
+def wall_time(args):
+    start = time.time()
+    result = subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return start, time.time() - start, result.stderr
+
+def best_of(runs, args):
+    return min(wall_time(args)[1] for _ in range(runs))
+
+def time_to_first_read(search_file):
+    timings = []
+    for _ in range(RUNS):
+        start, _, stderr = wall_time([sys.executable, '-c', FIRST_READ_PROBE, SCRIPT_PATH, '-w', '1', 'needle', search_file])
+        first_reads = [float(line.split()[1]) for line in stderr.splitlines() if line.startswith('first-read ')]
+        assert first_reads, f"the search never opened {search_file}:\n{stderr}"
+        timings.append(first_reads[0] - start)
+    return min(timings)
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        search_file = os.path.join(folder, 'small.log')
+        with open(search_file, 'w') as f:
+            f.write("just a few lines\nwith a needle in them\n")
+
+        interpreter = best_of(RUNS, [sys.executable, '-c', 'pass'])
+        module_import = best_of(RUNS, [sys.executable, '-c', IMPORT_MODULE.format(path=SCRIPT_PATH)])
+        first_read = time_to_first_read(search_file)
+        whole_search = best_of(RUNS, [sys.executable, SCRIPT_PATH, '-w', '1', 'needle', search_file])
+
+    print(f"{'interpreter start':<34}{interpreter * 1000:>8.1f}ms")
+    print(f"{'import Text-finder.py':<34}{module_import * 1000:>8.1f}ms")
+    print(f"{'first read of the searched file':<34}{first_read * 1000:>8.1f}ms   budget {STARTUP_BUDGET_MS}ms: "
+          f"{'OK' if first_read * 1000 <= STARTUP_BUDGET_MS else 'OVER'}")
+    print(f"{'whole search of one small file':<34}{whole_search * 1000:>8.1f}ms")
+
+    print("\nDeferred imports (only paid when needed):")
+    for module, used_for in (('PyPDF2', 'PDFs without pdftotext'), ('pyfiglet', 'the banner'),
+                             ('termcolor', 'the banner'), ('asyncio', '--io-concurrency'),
+                             ('concurrent.futures.process', 'worker pools'), ('sqlite3', 'PDF cache and index')):
+        cost = best_of(RUNS, [sys.executable, '-c', f'import {module}']) - interpreter
+        print(f"{'  ' + module:<34}{cost * 1000:>8.1f}ms   ({used_for})")
+
+if __name__ == '__main__':
+    main()